@@ -1,142 +1,269 @@
 import os
 import sys
+import csv
+import json
 import random
-from time import process_time
-import random
+import argparse
+from itertools import accumulate
+from time import perf_counter_ns, strftime
 
 
 # Add parent directory to PATH
 current_directory = os.path.dirname(os.path.realpath(__file__))  # pwd
 parent_directory = os.path.dirname(current_directory)            # cd ..
-sys.path.append(parent_directory)     
+sys.path.append(parent_directory)
+
+
+from src.bplus import BPlusTree
+
+
+FIELDS = ["workload", "deg", "size", "ops", "ns_per_op", "best_ns_per_op"]
+
+
+# --------------------------------------------------------------------------- #
+#                                 WORKLOADS                                   #
+# --------------------------------------------------------------------------- #
+# A workload takes (tree, size, args, rng) and returns (run, undo, ops): run()
+# is the timed part, undo() puts the tree back untimed so the same prebuilt
+# tree serves every repeat, and ops is how many operations run() performs.
+# The prebuilt tree holds the even rids 0, 2, ..., 2 * (size - 1).
+
+
+def zipf_keys(size, count, s, rng):
+    """ Draw count stored rids whose ranks follow a Zipf(s) law. """
+    weights = accumulate(1 / rank ** s for rank in range(1, size + 1))
+    ranks = rng.choices(range(size), cum_weights=list(weights), k=count)
+    spread = list(range(size))
+    rng.shuffle(spread)                     # Hot rids are not all adjacent.
+    return [2 * spread[rank] for rank in ranks]
+
+
+def sequential_insert(tree, size, args, rng):
+    rids = range(2 * size, 2 * size + args.ops)
+
+    def run():
+        for rid in rids:
+            tree.insert(rid, rid)
+    return run, lambda: tree.delete_range(rids[0], rids[-1]), len(rids)
+
+
+def uniform_insert(tree, size, args, rng):
+    rids = rng.sample(range(1, 2 * size, 2), min(args.ops, size))
+
+    def run():
+        for rid in rids:
+            tree.insert(rid, rid)
+    return run, lambda: tree.delete_many(rids), len(rids)
+
+
+def uniform_search(tree, size, args, rng):
+    rids = [2 * rng.randrange(size) for _ in range(args.ops)]
+
+    def run():
+        for rid in rids:
+            tree.search(rid)
+    return run, None, len(rids)
+
+
+def zipf_search(tree, size, args, rng):
+    rids = zipf_keys(size, args.ops, args.zipf, rng)
+
+    def run():
+        for rid in rids:
+            tree.search(rid)
+    return run, None, len(rids)
+
+
+def uniform_delete(tree, size, args, rng):
+    rids = rng.sample(range(0, 2 * size, 2), min(args.ops, size))
+
+    def run():
+        for rid in rids:
+            tree.delete(rid)
+    return run, lambda: tree.insert_many((rid, rid) for rid in rids), \
+        len(rids)
 
 
-from src.bplus import *
+def mixed(tree, size, args, rng):
+    """ Zipfian reads mixed with inserts of fresh rids. """
+    reads = zipf_keys(size, args.ops, args.zipf, rng)
+    writes = [rng.random() >= args.reads for _ in reads]
+    if writes.count(True) > size:        # Stop when the size odd rids run out.
+        writes = writes[:[i for i, w in enumerate(writes) if w][size]]
+    fresh = iter(rng.sample(range(1, 2 * size, 2), writes.count(True)))
+    plan = [(True, next(fresh)) if write else (False, rid)
+            for write, rid in zip(writes, reads)]
+    inserted = [rid for write, rid in plan if write]
 
+    def run():
+        for write, rid in plan:
+            if write:
+                tree.insert(rid, rid)
+            else:
+                tree.search(rid)
+    return run, lambda: tree.delete_many(inserted), len(plan)
 
-def populate_tree(tree, size):
-    for _ in range(size):
-        status = False
-        while not status:
-            random_rid = random.randint(0, 2**40)
-            status = tree.insert(random_rid, random_rid)
-    return
+
+def range_scan(tree, size, args, rng):
+    los = [2 * rng.randrange(size) for _ in range(max(1, args.ops // 100))]
+    span = 2 * args.span
+
+    def run():
+        for lo in los:
+            tree.range(lo, lo + span)
+    return run, None, len(los)
+
+
+def bulk_load(tree, size, args, rng):
+    pairs = [(2 * rid, rid) for rid in range(size)]
+
+    def run():
+        BPlusTree.bulk_load(tree.deg, pairs)
+    return run, None, size
+
+
+def inorder(tree, size, args, rng):
+    def run():
+        tree.inorder()
+    return run, None, size
+
+
+WORKLOADS = {
+    "sequential_insert": sequential_insert,
+    "uniform_insert": uniform_insert,
+    "uniform_search": uniform_search,
+    "zipf_search": zipf_search,
+    "uniform_delete": uniform_delete,
+    "mixed": mixed,
+    "range_scan": range_scan,
+    "bulk_load": bulk_load,
+    "inorder": inorder,
+}
+
+
+# --------------------------------------------------------------------------- #
+#                                  RUNNER                                     #
+# --------------------------------------------------------------------------- #
+
+
+def measure(tree, size, workload, args, rng):
+    run, undo, ops = WORKLOADS[workload](tree, size, args, rng)
+    for _ in range(args.warmup):                   # Warm caches untimed.
+        run()
+        if undo:
+            undo()
+    samples = []
+    for _ in range(args.repeat):
+        t0 = perf_counter_ns()
+        run()
+        t1 = perf_counter_ns()
+        samples.append((t1 - t0) / ops)
+        if undo:
+            undo()
+    samples.sort()
+    return {"workload": workload, "deg": tree.deg, "size": size, "ops": ops,
+            "ns_per_op": samples[len(samples) // 2],
+            "best_ns_per_op": samples[0]}
+
+
+def run_suite(args):
+    rng = random.Random(args.seed)
+    results = []
+    for deg in args.degrees:
+        for size in args.sizes:
+            tree = BPlusTree.bulk_load(deg, ((2 * rid, rid)
+                                             for rid in range(size)))
+            for workload in args.workloads:
+                result = measure(tree, size, workload, args, rng)
+                results.append(result)
+                print(f"{workload:<18}deg={deg:<5}size={size:<9}"
+                      f"{result['ns_per_op']:>12.0f} ns/op", file=sys.stderr)
+    return results
+
+
+def write(results, path, fmt):
+    with open(path, "w", newline="") as fp:
+        if fmt == "json":
+            json.dump(results, fp, indent=1)
+        else:
+            writer = csv.DictWriter(fp, FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+
+
+def read(path):
+    with open(path, newline="") as fp:
+        if path.endswith(".json"):
+            return json.load(fp)
+        return [{**row, "ns_per_op": float(row["ns_per_op"])}
+                for row in csv.DictReader(fp)]
+
+
+def compare(results, baseline, threshold):
+    """ Print each result against the baseline; return the regressions. """
+    def key(row):
+        return row["workload"], int(row["deg"]), int(row["size"])
+    old = {key(row): row["ns_per_op"] for row in baseline}
+    regressions = []
+    for row in results:
+        before = old.get(key(row))
+        if before is None:
+            continue
+        change = row["ns_per_op"] / before - 1
+        flag = ""
+        if change > threshold:
+            flag = "REGRESSION"
+            regressions.append(row)
+        elif change < -threshold:
+            flag = "improved"
+        workload, deg, size = key(row)
+        print(f"{workload:<18}deg={deg:<5}size={size:<9}{before:>10.0f} ->"
+              f"{row['ns_per_op']:>10.0f} ns/op {change:>+8.1%}  {flag}")
+    return regressions
 
 
 def main():
-    ID = random.randint(100000, 999999) # 6 digit number
-    try:
-        DEG = int(input("Enter degree of BTree <int> (default=3):"))
-    except:
-        DEG = 3
-    try:
-        ITERATIONS = int(input("Enter sample size <int> (default=20):"))
-    except:
-        ITERATIONS = 20
-    
-    out = os.path.join(current_directory, "output", f"out_deg{DEG}_avg{ITERATIONS}_id{ID}.csv")
-    fp = open(out, "w")
-    sys.stdout = fp
-
-    # ELEMENTS = [2**i for i in range(1, 16)]
-    ELEMENTS = [10*i for i in range(1, 500)]
-
-    print(f"DEG={DEG}\tSample={ITERATIONS}")
-
-    print("Elements", end="")
-    for n in ELEMENTS:
-        print(f"\t{n}", end="")
-    print("")
-
-    print("Gathering data for insertion...", file=sys.stderr)
-    print("Insertion", end="")    
-    for n in ELEMENTS:
-        print(f"    n={n}..", end="", file=sys.stderr)
-        avg_elapsed_time = 0
-        for i in range(ITERATIONS):
-            print(f".{i+1}", end="", file=sys.stderr)
-            sys.stderr.flush()
-            tree = BPlusTree(DEG)
-            populate_tree(tree, n)
-            status = False
-            elapsed_time = 0
-            while not status:
-                random_rid = random.randint(0, 2**40)
-                t0 = process_time()
-                status = tree.insert(random_rid, random_rid)
-                t1 = process_time()
-                elapsed_time = t1 - t0
-            avg_elapsed_time += elapsed_time
-        avg_elapsed_time /= ITERATIONS
-        print(f"\t{avg_elapsed_time}", end="")
-        print("", file=sys.stderr)
-    print("")
-    print("", file=sys.stderr)
-
-    print("Gathering data for deletion...", file=sys.stderr)
-    print("Deletion", end="")    
-    for n in ELEMENTS:
-        print(f"    n={n}..", end="", file=sys.stderr)
-        avg_elapsed_time = 0
-        for i in range(ITERATIONS):
-            print(f".{i+1}", end="", file=sys.stderr)
-            sys.stderr.flush()
-            tree = BPlusTree(DEG)
-            populate_tree(tree, n)
-            population = sorted(tree.rid_set)
-            random_rid = random.sample(population, 1)[0]
-            t0 = process_time()
-            tree.delete(random_rid)
-            t1 = process_time()
-            avg_elapsed_time += t1 - t0
-        avg_elapsed_time /= ITERATIONS 
-        print(f"\t{avg_elapsed_time}", end="")
-        print("", file=sys.stderr)
-    print("")
-    print("", file=sys.stderr)
-
-    print("Gathering data for search...", file=sys.stderr)
-    print("Search", end="")    
-    for n in ELEMENTS:
-        print(f"    n={n}..", end="", file=sys.stderr)
-        avg_elapsed_time = 0
-        for i in range(ITERATIONS):
-            print(f".{i+1}", end="", file=sys.stderr)
-            sys.stderr.flush()
-            tree = BPlusTree(DEG)
-            populate_tree(tree, n)
-            population = sorted(tree.rid_set)
-            random_rid = random.sample(population, 1)[0]
-            t0 = process_time()
-            tree.search(random_rid)
-            t1 = process_time()
-            avg_elapsed_time += t1 - t0
-        avg_elapsed_time /= ITERATIONS 
-        print(f"\t{avg_elapsed_time}", end="")
-        print("", file=sys.stderr)
-    print("")
-    print("", file=sys.stderr)
-
-    print("Gathering data for inorder...", file=sys.stderr)
-    print("Inorder", end="")    
-    for n in ELEMENTS:
-        print(f"    n={n}..", end="", file=sys.stderr)
-        avg_elapsed_time = 0
-        for i in range(ITERATIONS):
-            print(f".{i+1}", end="", file=sys.stderr)
-            sys.stderr.flush()
-            tree = BPlusTree(DEG)
-            populate_tree(tree, n)
-            t0 = process_time()
-            tree.inorder()
-            t1 = process_time()
-            avg_elapsed_time += t1 - t0
-        avg_elapsed_time /= ITERATIONS 
-        print(f"\t{avg_elapsed_time}", end="")
-        print("", file=sys.stderr)
-    print("", file=sys.stderr)
-
-    fp.close()    
+    parser = argparse.ArgumentParser(
+        description="Benchmark B+ tree workloads across degrees and sizes.")
+    parser.add_argument("--degrees", type=int, nargs="+",
+                        default=[4, 8, 16, 32, 64])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1000, 10000, 100000])
+    parser.add_argument("--workloads", nargs="+", default=list(WORKLOADS),
+                        choices=list(WORKLOADS), metavar="WORKLOAD",
+                        help=f"any of: {', '.join(WORKLOADS)}")
+    parser.add_argument("--ops", type=int, default=2000,
+                        help="operations per timed run")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="timed runs per measurement (median is kept)")
+    parser.add_argument("--warmup", type=int, default=1,
+                        help="untimed runs before measuring")
+    parser.add_argument("--reads", type=float, default=0.8,
+                        help="fraction of reads in the mixed workload")
+    parser.add_argument("--zipf", type=float, default=1.1,
+                        help="Zipf exponent for skewed workloads")
+    parser.add_argument("--span", type=int, default=100,
+                        help="rids returned by each range scan")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    parser.add_argument("--out", default=None, help="output file (default: "
+                        "data/output/bench_<time>.<format>)")
+    parser.add_argument("--baseline", default=None,
+                        help="earlier output to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    results = run_suite(args)
+    out = args.out or os.path.join(current_directory, "output",
+                                   f"bench_{strftime('%Y%m%d_%H%M%S')}."
+                                   f"{args.format}")
+    write(results, out, args.format)
+    print(f"wrote {len(results)} results to {out}", file=sys.stderr)
+    if args.baseline:
+        regressions = compare(results, read(args.baseline), args.threshold)
+        sys.exit(1 if regressions else 0)
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,116 @@
+import os
+import sys
+import random
+import asyncio
+import argparse
+from time import perf_counter
+
+
+# Add parent directory to PATH
+current_directory = os.path.dirname(os.path.realpath(__file__))  # pwd
+parent_directory = os.path.dirname(current_directory)            # cd ..
+sys.path.append(parent_directory)
+
+
+from src.bplus import BPlusTree
+from src.server import BATCH_LIMIT, PORT, TreeClient, TreeServer
+
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+async def worker(client, n, args, latencies):
+    """ Issue args.ops requests one after another, timing each one. """
+    rng = random.Random(n)
+    value = b"x" * args.value
+    for _ in range(args.ops):
+        rid = rng.randrange(args.keys)
+        roll = rng.random()
+        start = perf_counter()
+        if roll < args.reads:
+            op = "search"
+            await client.search(rid)
+        elif roll < args.reads + args.scans:
+            op = "range"
+            async for _ in client.range(rid, rid + args.span):
+                pass
+        elif roll < args.reads + args.scans + args.deletes:
+            op = "delete"
+            await client.delete(rid)
+        else:
+            op = "insert"
+            await client.insert(rid, value)
+        latencies.setdefault(op, []).append(perf_counter() - start)
+
+
+async def run(args):
+    server = None
+    if args.host is None and args.path is None:         # Serve in-process.
+        tree = BPlusTree.bulk_load(args.deg, ((rid, b"x" * args.value)
+                                              for rid in range(args.keys)))
+        server = await TreeServer(tree, args.batch).start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        clients = [await TreeClient.connect(port=port)
+                   for _ in range(args.connections)]
+    else:
+        clients = [await TreeClient.connect(args.host or "127.0.0.1",
+                                            args.port, args.path)
+                   for _ in range(args.connections)]
+    latencies = {}
+    start = perf_counter()
+    await asyncio.gather(*(worker(clients[n % len(clients)], n, args,
+                                  latencies)
+                           for n in range(args.clients)))
+    elapsed = perf_counter() - start
+    for client in clients:
+        await client.close()
+    if server is not None:
+        server.close()
+        await server.wait_closed()
+
+    total = sum(len(samples) for samples in latencies.values())
+    print(f"{total / elapsed:>12.0f} ops/s{elapsed:>10.3f} s")
+    for op, samples in sorted(latencies.items()):
+        samples.sort()
+        print(f"{op:<8}{len(samples):>8}"
+              f"   p50 {percentile(samples, 0.50) * 1e3:8.3f} ms"
+              f"   p99 {percentile(samples, 0.99) * 1e3:8.3f} ms"
+              f"   max {samples[-1] * 1e3:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load generator for the B+ tree server (src/server.py). "
+                    "Without --host or --path it serves a tree in-process.")
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--path", default=None, help="Unix socket path")
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=64,
+                        help="concurrent request loops over the connections")
+    parser.add_argument("--ops", type=int, default=2000,
+                        help="requests per client")
+    parser.add_argument("--keys", type=int, default=2**16)
+    parser.add_argument("--deg", type=int, default=64)
+    parser.add_argument("--value", type=int, default=16,
+                        help="bytes per inserted value")
+    parser.add_argument("--reads", type=float, default=0.8,
+                        help="fraction of point lookups")
+    parser.add_argument("--scans", type=float, default=0.02,
+                        help="fraction of range scans")
+    parser.add_argument("--deletes", type=float, default=0.05)
+    parser.add_argument("--batch", type=int, default=BATCH_LIMIT,
+                        help="in-process server's batch limit (1 = none)")
+    parser.add_argument("--span", type=int, default=100,
+                        help="rids covered by each range scan")
+    args = parser.parse_args()
+
+    print(f"connections={args.connections} clients={args.clients} "
+          f"ops={args.ops} keys={args.keys} reads={args.reads} "
+          f"scans={args.scans} deletes={args.deletes}")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import os
+import sys
+import random
+import argparse
+import threading
+from time import perf_counter
+
+
+# Add parent directory to PATH
+current_directory = os.path.dirname(os.path.realpath(__file__))  # pwd
+parent_directory = os.path.dirname(current_directory)            # cd ..
+sys.path.append(parent_directory)
+
+
+from src.bplus import BPlusTree
+from src.concurrency import ConcurrentBPlusTree
+
+
+class LockedBPlusTree():
+    """ Baseline: a plain BPlusTree behind one global lock. """
+
+    def __init__(self, deg) -> None:
+        self.tree = BPlusTree(deg)
+        self.lock = threading.Lock()
+
+    def insert(self, rid, data=True):
+        with self.lock:
+            return self.tree.insert(rid, data)
+
+    def delete(self, rid):
+        with self.lock:
+            return self.tree.delete(rid)
+
+    def search(self, rid):
+        with self.lock:
+            return self.tree.search(rid)
+
+    def range(self, rid_1, rid_2):
+        with self.lock:
+            return self.tree.range(rid_1, rid_2)
+
+    def inorder(self):
+        return self.tree.inorder()
+
+
+def worker(tree, n, args, errors):
+    """ Writes only rids congruent to n, so the final state is known. """
+    rng = random.Random(n)
+    mine = list(range(n, args.keys, args.threads))
+    rng.shuffle(mine)
+    live = set()
+    try:
+        for _ in range(args.ops):
+            roll = rng.random()
+            if roll < args.reads:
+                rid = rng.randrange(args.keys)
+                tree.search(rid)
+            elif roll < args.reads + args.scans:
+                lo = rng.randrange(args.keys)
+                rids = tree.range(lo, lo + 64)
+                if rids != sorted(rids):
+                    errors.append(f"unsorted scan from {lo}")
+            else:
+                rid = rng.choice(mine)
+                if rid in live:
+                    if not tree.delete(rid):
+                        errors.append(f"lost {rid}")
+                    live.discard(rid)
+                else:
+                    if not tree.insert(rid, rid):
+                        errors.append(f"duplicate {rid}")
+                    live.add(rid)
+    except Exception as e:
+        errors.append(repr(e))
+    return live
+
+
+def run(tree_class, args):
+    tree = tree_class(args.deg)
+    errors, results = [], [None] * args.threads
+
+    def target(n):
+        results[n] = worker(tree, n, args, errors)
+
+    threads = [threading.Thread(target=target, args=(n,))
+               for n in range(args.threads)]
+    start = perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = perf_counter() - start
+    expected = sorted(set().union(*results))
+    if tree.inorder() != expected:
+        errors.append("final contents differ from the writers' view")
+    ops = args.threads * args.ops
+    print(f"{tree_class.__name__:<20}{ops / elapsed:>12.0f} ops/s"
+          f"{elapsed:>10.3f} s   errors={len(errors)}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Multithreaded stress and throughput benchmark.")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=20000,
+                        help="operations per thread")
+    parser.add_argument("--keys", type=int, default=2**16)
+    parser.add_argument("--deg", type=int, default=32)
+    parser.add_argument("--reads", type=float, default=0.7,
+                        help="fraction of point lookups")
+    parser.add_argument("--scans", type=float, default=0.05,
+                        help="fraction of short range scans")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    print(f"threads={args.threads} ops={args.ops} keys={args.keys} "
+          f"deg={args.deg} reads={args.reads} scans={args.scans}")
+    errors = run(LockedBPlusTree, args) + run(ConcurrentBPlusTree, args)
+    for error in errors[:10]:
+        print(error)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
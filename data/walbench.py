@@ -0,0 +1,71 @@
+import os
+import sys
+import random
+import argparse
+import tempfile
+from time import perf_counter
+
+
+# Add parent directory to PATH
+current_directory = os.path.dirname(os.path.realpath(__file__))  # pwd
+parent_directory = os.path.dirname(current_directory)            # cd ..
+sys.path.append(parent_directory)
+
+
+from src.wal import SYNC_MODES, LoggedBPlusTree
+
+
+def run(mode, args, directory):
+    """ Time args.ops logged inserts in one sync mode; return a result row. """
+    path = os.path.join(directory, mode)
+    rids = random.Random(args.seed).sample(range(2**40), args.ops)
+    value = "x" * args.value
+    tree = LoggedBPlusTree(path, args.deg, sync=mode,
+                           group_size=args.group_size,
+                           group_interval=args.group_interval)
+    start = perf_counter()
+    if args.batch > 1:
+        for i in range(0, args.ops, args.batch):
+            tree.insert_many((rid, value) for rid in rids[i:i + args.batch])
+    else:
+        for rid in rids:
+            tree.insert(rid, value)
+    tree.commit()                        # Count the final fsync in every mode.
+    elapsed = perf_counter() - start
+    syncs = tree.wal.syncs
+    tree.close()
+    return mode, args.ops / elapsed, elapsed / args.ops * 1e6, syncs
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Insert throughput of LoggedBPlusTree (src/wal.py) "
+                    "in each fsync mode.")
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--deg", type=int, default=64)
+    parser.add_argument("--modes", nargs="+", choices=SYNC_MODES,
+                        default=list(SYNC_MODES))
+    parser.add_argument("--group-size", type=int, default=64,
+                        help="records per fsync in group mode")
+    parser.add_argument("--group-interval", type=float, default=0.01,
+                        help="seconds before a group fsync at the latest")
+    parser.add_argument("--batch", type=int, default=1,
+                        help="rids per insert_many call (1 = insert)")
+    parser.add_argument("--value", type=int, default=16,
+                        help="characters per inserted value")
+    parser.add_argument("--dir", default=None,
+                        help="where to write the logs (default: a temp dir)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"ops={args.ops} deg={args.deg} group_size={args.group_size} "
+          f"group_interval={args.group_interval} batch={args.batch}")
+    print(f"{'sync':<8}{'ops/s':>12}{'us/op':>10}{'fsyncs':>9}")
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        for mode in args.modes:
+            mode, rate, latency, syncs = run(mode, args, directory)
+            print(f"{mode:<8}{rate:>12.0f}{latency:>10.1f}{syncs:>9}")
+
+
+if __name__ == "__main__":
+    main()
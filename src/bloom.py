@@ -0,0 +1,57 @@
+import math
+
+MIX = 0x9E3779B97F4A7C15                      # 64-bit golden ratio multiplier.
+MASK = (1 << 64) - 1
+
+
+class BloomFilter():
+    """ A bloom filter sized for `capacity` adds at a false positive `error`.
+
+    Only negative answers are exact. Items cannot be removed, so a filter
+    that is kept next to a mutable set must be rebuilt once `added` grows
+    past `capacity` (or deletions have left too many stale bits).
+
+    A probe costs a few Python-level operations, so the filter only pays
+    for itself when a real lookup is dearer than that (slow comparisons,
+    or a tree that is not held in memory).
+    """
+
+    def __init__(self, capacity, error=0.01) -> None:
+        if not 0 < error < 1:
+            raise ValueError("error must be in the range (0, 1)")
+        capacity = max(1, capacity)
+        bits = -capacity * math.log(error) / math.log(2) ** 2
+        self.capacity = capacity
+        self.error = error
+        self.size = max(8, int(bits))                           # Size in bits.
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.added = 0
+
+    def probes(self, item):
+        """ Yield the bit positions of item by double hashing one hash. """
+        h = (hash(item) * MIX) & MASK           # Spread out small, dense ints.
+        step = (h >> 32) | 1
+        for _ in range(self.hashes):
+            yield h % self.size
+            h += step
+
+    def add(self, item):
+        bits = self.bits
+        for i in self.probes(item):
+            bits[i >> 3] |= 1 << (i & 7)
+        self.added += 1
+
+    def __contains__(self, item):
+        h = (hash(item) * MIX) & MASK                       # Inlined probes().
+        step = (h >> 32) | 1
+        bits, size = self.bits, self.size
+        for _ in range(self.hashes):
+            i = h % size
+            if not bits[i >> 3] >> (i & 7) & 1:
+                return False                         # Usually on probe 1 or 2.
+            h += step
+        return True
+
+    def nbytes(self):
+        return len(self.bits)
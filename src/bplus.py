@@ -1,70 +1,104 @@
 import math
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import partial
+from itertools import islice, repeat
+from sys import getsizeof
+
+from .bloom import BloomFilter
+from .instrument import Instrumentation
 
 NOT_FOUND = -1
-RID_INDEX = 0
-PTR_INDEX = 1
+BLOOM_MIN = 1024                         # Smallest capacity of a bloom filter.
+KEY_TYPES = ("object", "int64")
 
 class BPlusNode():
+    """ A node keeps its keys and pointers in two parallel sorted arrays.
+
+    Leaf:     keys[i] maps to the data in ptrs[i]; len(ptrs) == len(keys).
+    Internal: ptrs[i] holds every rid < keys[i] (and >= keys[i - 1]), so an
+              internal node always has exactly one more ptr than keys.
+
+    Every node remembers its slot in the parent's ptrs so that parent lookups
+    are O(1) instead of a scan; slots are renumbered whenever the parent's
+    ptrs shift (see reindex).
+    """
+    __slots__ = ('parent', 'slot', 'is_leaf', 'keys', 'ptrs', 'next', 'prev',
+                 'count', 'total')
+    key_array = list                           # Builds the keys of every node.
+
     def __init__(self, is_leaf=True) -> None:
         self.parent = None
+        self.slot = 0
         self.is_leaf = is_leaf
-        self.size = 0
-        self.children = [self.nodeify(float('inf'), None)]
+        self.keys = self.key_array()
+        self.ptrs = []
         self.next = None
         self.prev = None
+        self.count = 0                # Rids in the subtree (with order_stats).
+        self.total = 0                         # Sum of their data (with sums).
 
-    def nodeify(self, value, ptr):
-        """ This Defines the Schema of a BPlusNode. """
-        return [value, ptr]
+    @property
+    def size(self):
+        return len(self.keys)
 
     def add(self, value, ptr=None):
-        self.children.append(self.nodeify(value, ptr))
-        self.children.sort(key=lambda x: x[0])                   # Sort by rid.
-        self.size += 1                                        # The node grows!
-        return None 
+        i = bisect_left(self.keys, value)
+        self.keys.insert(i, value)
+        self.ptrs.insert(i, ptr)
+        return None
 
     def pop(self, index=0):
-        self.children.pop(index)
-        self.size -= 1                                      # The node shrinks!
-        return None 
+        self.keys.pop(index)
+        self.ptrs.pop(index)
+        return None
+
+    def reindex(self, start=0):
+        ptrs = self.ptrs
+        for i in range(start, len(ptrs)):      # Children right of start moved.
+            ptrs[i].slot = i
+        return None
+
+    def adopt(self, start=0):
+        ptrs = self.ptrs
+        for i in range(start, len(ptrs)):       # Children moved to a new node.
+            ptrs[i].parent = self
+            ptrs[i].slot = i
+        return None
 
     def get_index_of(self, search_key):
-        if isinstance(search_key, BPlusNode):
-            search_index = PTR_INDEX     # We are searching by using BPlusNode.
-        else:
-            search_index = RID_INDEX     # We are searching by using rid <int>.
-        for i, child in enumerate(self.children):
-            if search_key == child[search_index]:
-                return i               # Return index where we found the match.
+        if isinstance(search_key, BPlusNode):              # Lookup by pointer.
+            if search_key.parent is self:
+                return search_key.slot
+            return NOT_FOUND
+        i = bisect_left(self.keys, search_key)                 # Lookup by rid.
+        if i < len(self.keys) and self.keys[i] == search_key:
+            return i
         return NOT_FOUND
-    
+
     def get_siblings(self):
         result = [None, None]
         if not self.parent:                           # No parent, no siblings.
             return result
-        ptr = self.parent.get_index_of(self)
-        if ptr - 1 >= 0:                 # Ptr arithmetic to find the lsibling.
-            result[0] = self.parent.children[ptr - 1][PTR_INDEX]
-        if ptr + 1 <= self.parent.size:  # Ptr arithmetic to find the rsibling.
-            result[1] = self.parent.children[ptr + 1][PTR_INDEX]
+        ptrs = self.parent.ptrs
+        if self.slot > 0:
+            result[0] = ptrs[self.slot - 1]
+        if self.slot + 1 < len(ptrs):
+            result[1] = ptrs[self.slot + 1]
         return result
 
     def get_max(self, mode: str):
-        if mode == "r": # Return the max rid which is the second to last child.
-            return self.children[-2][RID_INDEX] 
-        if mode == "p":     # Return the max BPlusNode which is the last child.
-            return self.children[-1][PTR_INDEX]
-        if mode == "d":                  # [For leaf nodes] get the max "data".
-            return self.children[-2][PTR_INDEX]
+        if mode == "r":                                   # Return the max rid.
+            return self.keys[-1]
+        if mode == "p" or mode == "d":        # Return the max child (or data).
+            return self.ptrs[-1]
         raise Exception("Invalid mode")
-    
+
     def get_min(self, mode: str):
-        if mode == "r":          # Return the min rid which is the first child.
-            return self.children[0][RID_INDEX]
-        if mode == "p":    # Return the min BPlusNode which is the first child.
-            return self.children[0][PTR_INDEX]
-        if mode == "d":                  # [For leaf nodes] get the min "data".
-            return self.children[0][PTR_INDEX]
+        if mode == "r":                                   # Return the min rid.
+            return self.keys[0]
+        if mode == "p" or mode == "d":        # Return the min child (or data).
+            return self.ptrs[0]
         raise Exception("Invalid mode")
 
     # ----------------------------------------------------------------------- #
@@ -74,198 +108,899 @@ class BPlusNode():
     def __repr__(self) -> str:
         if self.is_leaf:
             return self.__leaf_repr__()
-        string = f"BPlusNode("
-        string += str(self.children[0][RID_INDEX])
-        for child in self.children[1:]:
-            string += f", {child[RID_INDEX]}"
-        string += ")"
-        return string
-    
+        return "BPlusNode(" + ", ".join(str(k) for k in self.keys) + ")"
+
     def __leaf_repr__(self) -> str:
-        string = "BPlusNode(["
-        string += str(self.children[0][RID_INDEX]) + ", "
-        string += str(self.children[0][PTR_INDEX]) + "]"
-        for child in self.children[1:self.size]:
-            string += f", [{child[RID_INDEX]}, "
-            string += f"{child[PTR_INDEX]}]"
-        string += ")"
-        return string
+        pairs = (f"[{k}, {p}]" for k, p in zip(self.keys, self.ptrs))
+        return "BPlusNode(" + ", ".join(pairs) + ")"
+
+
+class Int64Node(BPlusNode):
+    """ A node whose keys are unboxed 64-bit ints in an array('q').
+
+    Each key costs 8 bytes instead of a pointer plus an int object, and a
+    rid that is not an int64 raises TypeError (or OverflowError).
+    """
+    __slots__ = ()
+    key_array = partial(array, "q")
 
 
 class BPlusTree():
-    def __init__(self, deg) -> None:
-        self.rid_set = set()
+    node_class = BPlusNode         # Subclasses may swap in a richer node type.
+
+    def __init__(self, deg, bloom=False, bloom_error=0.01,
+                 key_type="object", order_stats=False, sums=False,
+                 finger=False, pack_appends=False, relaxed=False) -> None:
+        if key_type not in KEY_TYPES:
+            raise ValueError(f"key_type must be one of {KEY_TYPES}")
+        if key_type == "int64":
+            self.node_class = Int64Node
+        self.key_type = key_type
+        self.order_stats = order_stats or sums       # Keep per-subtree counts,
+        self.sums = sums                            # and sums of the data too.
+        self.size = 0                                 # Number of rids in tree.
         self.deg = deg
         self.min_node_size = math.ceil(deg / 2) - 1
         self.root = None
+        self.bloom_error = bloom_error
+        self.bloom = None          # Optional filter for fast negative lookups.
+        if bloom:
+            self.bloom = BloomFilter(BLOOM_MIN, bloom_error)
+        self.finger_search = finger                # Check the last leaf first.
+        self.finger = None                                # The last leaf used.
+        self.finger_hits = 0
+        self.finger_misses = 0
+        self.pack_appends = pack_appends        # Split the last leaf unevenly.
+        self.relaxed = relaxed          # Leave underfull leaves for compact().
+        self.underflow = set()                # Leaves that compact() will fix.
 
-    def insert(self, rid, data=True):
-        if rid in self.rid_set:           # Check if rid already exist in tree.
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, rid):
+        if not self.root:                             # Check if tree is empty.
             return False
-        self.rid_set.add(rid)
-        self.root = self.root or BPlusNode()
-        leaf, _ = self.find_nodes(rid)   # Find a leaf that to contain the rid.
-        leaf.add(rid, data)                     # Add rid and data to the leaf.
-        if leaf.size == self.deg:            # Check if leaf has too many keys.
-            self.split(leaf)           # Split leaf (propogates split upwards).
+        if self.bloom is not None and rid not in self.bloom:
+            return False                              # Definitely not in tree.
+        keys = self.find_leaf(rid).keys
+        k = bisect_left(keys, rid)
+        return k < len(keys) and keys[k] == rid
+
+    @classmethod
+    def bulk_load(cls, deg, items, fill=1.0, **kwargs):
+        """ Build a tree bottom-up from (rid, data) pairs in ascending order.
+
+        Leaves are packed to `fill` of their capacity in a single pass over
+        `items`, then each internal level is built from the level below it.
+        Raises ValueError if the rids are not strictly increasing.
+        """
+        if not 0 < fill <= 1:
+            raise ValueError("fill must be in the range (0, 1]")
+        tree = cls(deg, **kwargs)
+        leaf_cap = max(1, tree.min_node_size, int(fill * (deg - 1)))
+        leaves = []
+        leaf = tree.node_class()
+        for rid, data in items:
+            if (leaf.keys or leaves) and not last < rid:     # Sorted & unique.
+                raise ValueError(f"bulk_load rids out of order at {rid!r}")
+            last = rid
+            if len(leaf.keys) == leaf_cap:       # Leaf is full, start another.
+                leaves.append(leaf)
+                leaf = tree.node_class()
+            leaf.keys.append(rid)
+            leaf.ptrs.append(data)
+            tree.size += 1
+        if not leaf.keys:                                    # Nothing to load.
+            return tree
+        leaves.append(leaf)
+        if len(leaves) > 1 and len(leaf.keys) < tree.min_node_size:
+            prev = leaves[-2]             # Top up the underfull last leaf from
+            keys = prev.keys + leaf.keys                  # its left neighbour.
+            ptrs = prev.ptrs + leaf.ptrs
+            half = len(keys) // 2 if len(keys) >= deg else len(keys)
+            prev.keys, leaf.keys = keys[:half], keys[half:]
+            prev.ptrs, leaf.ptrs = ptrs[:half], ptrs[half:]
+            if not leaf.keys:
+                leaves.pop()
+        for prev, node in zip(leaves, leaves[1:]):      # Link leaves together.
+            prev.next = node
+            node.prev = prev
+        if tree.order_stats:
+            for node in leaves:
+                tree.weigh(node)
+        fanout = max(2, tree.min_node_size + 1, int(fill * deg))
+        level = leaves
+        lows = [node.keys[0] for node in leaves]
+        while len(level) > 1:                   # Build internal levels upward.
+            level, lows = tree.build_level(level, lows, fanout)
+        tree.root = level[0]
+        if tree.bloom is not None:
+            tree.rebuild_bloom()
+        return tree
+
+    def build_level(self, children, lows, fanout):
+        n = len(children)
+        bounds = list(range(0, n, fanout)) + [n]
+        if len(bounds) > 2 and n - bounds[-2] <= self.min_node_size:
+            total = n - bounds[-3]       # Last parent would underflow, so pool
+            if total <= self.deg:                 # it with its left neighbour.
+                bounds.pop(-2)
+            else:
+                bounds[-2] = bounds[-3] + total // 2
+        parents = []
+        parent_lows = []
+        for a, b in zip(bounds, bounds[1:]):
+            node = self.node_class(is_leaf=False)
+            node.keys.extend(lows[a + 1:b])
+            node.ptrs = children[a:b]
+            node.adopt()
+            if self.order_stats:
+                self.weigh(node)
+            parents.append(node)
+            parent_lows.append(lows[a])
+        return parents, parent_lows
+
+    def insert(self, rid, data=True):
+        self.root = self.root or self.node_class()
+        leaf = self.seek(rid)            # Find a leaf that to contain the rid.
+        i = bisect_left(leaf.keys, rid)
+        if i < len(leaf.keys) and leaf.keys[i] == rid:
+            return False                  # Check if rid already exist in tree.
+        leaf.keys.insert(i, rid)                # Add rid and data to the leaf.
+        leaf.ptrs.insert(i, data)
+        self.size += 1
+        if self.bloom is not None:
+            self.bloom_add(rid)
+        if self.order_stats:
+            self.bump(leaf, 1, data if self.sums else 0)
+        if len(leaf.keys) >= self.deg:       # Check if leaf has too many keys.
+            if self.pack_appends and leaf.next is None and i == self.deg - 1:
+                self.split(leaf, self.deg - 1)      # Append: keep leaf packed.
+            else:
+                self.split(leaf)       # Split leaf (propogates split upwards).
+            if self.finger_search and not rid < leaf.next.keys[0]:
+                self.finger = leaf.next           # Follow the rid to its half.
         return True
 
-    def split(self, node):
+    def split(self, node, mid=None):
+        grew = not node.parent
         if not node.parent:       # Make a parent if this node didn't have one.
-            node.parent = BPlusNode(is_leaf=False)    
-            node.parent.children[0][PTR_INDEX] = node    
-        if node == self.root:
+            node.parent = self.node_class(is_leaf=False)
+            node.parent.ptrs.append(node)
+            node.slot = 0
+        if node is self.root:
             self.root = node.parent              # Grow the height of the tree.
-        lchild = BPlusNode(is_leaf=node.is_leaf)       # Create a left sibling.
-        lchild.parent = node.parent
-        if node.is_leaf and node.prev:          # (1) Link leaf nodes together.
-            lchild.prev = node.prev
-            node.prev.next = lchild
-        if node.is_leaf:                        # (2) Link leaf nodes together.
-            lchild.next = node
-            node.prev = lchild
-        self.rotate(node, lchild)    # Shuffle keys around to balance the tree.
-        if node.parent.size == self.deg:
+        rchild = self.node_class(is_leaf=node.is_leaf)     # New right sibling.
+        rchild.parent = node.parent
+        self.rotate(node, rchild, mid)               # Shuffle keys to balance.
+        if node.is_leaf:              # Link leaves only once rchild is filled.
+            rchild.next = node.next
+            rchild.prev = node
+            if node.next:
+                node.next.prev = rchild
+            node.next = rchild
+        if self.order_stats:
+            self.weigh(node)
+            self.weigh(rchild)
+            if grew:
+                self.weigh(node.parent)
+        if len(node.parent.keys) == self.deg:
             self.split(node.parent)                  # Propogate split upwards.
         return None
-    
-    def rotate(self, node, lchild):
-        mid = node.size // 2 
-        mrid, mchild = node.children[mid]
-        node.parent.add(mrid, lchild)
-        for child in node.children[0:mid]:   # mv half the nodes to the lchild.
-            lchild.add(child[RID_INDEX], child[PTR_INDEX])
-            node.pop()
-        if not node.is_leaf:               # Check if node is an internal node.
-            node.pop()                                 # Pop ref. to min child.
-            lchild.children[-1][PTR_INDEX] = mchild   # lchild inherits mchild.
-            lchild.children[-1][PTR_INDEX].parent = lchild     # Update parent.
-            for child in lchild.children:      # Attach children to new parent.
-                if child[PTR_INDEX]:
-                    child[PTR_INDEX].parent = lchild           # Update parent.
+
+    def rotate(self, node, rchild, mid=None):
+        if mid is None:
+            mid = len(node.keys) // 2
+        if node.is_leaf:              # Leaves keep a copy of the promoted rid.
+            rchild.keys = node.keys[mid:]
+            rchild.ptrs = node.ptrs[mid:]
+            mrid = rchild.keys[0]
+        else:                        # Internal nodes hand the middle rid over.
+            mrid = node.keys[mid]
+            rchild.keys = node.keys[mid + 1:]
+            rchild.ptrs = node.ptrs[mid + 1:]
+            rchild.adopt()                     # Attach children to new parent.
+            del node.ptrs[mid + 1:]
+        del node.keys[mid:]
+        if node.is_leaf:
+            del node.ptrs[mid:]
+        p = node.parent
+        p.keys.insert(node.slot, mrid)         # Promote the middle rid upward.
+        p.ptrs.insert(node.slot + 1, rchild)
+        p.reindex(node.slot + 1)
+        return None
+
+    def insert_many(self, pairs):
+        """ Insert a batch of (rid, data) pairs.
+
+        The batch is sorted and every run of rids that falls into the same
+        leaf is merged into it with one descent; overfull nodes are split
+        once per batch. Returns one flag per pair, in input order, with the
+        same meaning as insert's return value.
+        """
+        pairs = list(pairs)
+        if self.key_type == "int64":         # Reject bad rids before any edit.
+            self.node_class.key_array(rid for rid, _ in pairs)
+        order = sorted(range(len(pairs)), key=lambda i: pairs[i][0])
+        result = [False] * len(pairs)
+        bloom = self.bloom
+        pos, n = 0, len(order)
+        leaf = None
+        while pos < n:
+            self.root = self.root or self.node_class()
+            leaf, hi = self.find_fence(pairs[order[pos]][0], leaf)
+            keys, ptrs = leaf.keys, leaf.ptrs
+            before, before_total = len(keys), leaf.total
+            lo = 0
+            while pos < n:
+                i = order[pos]
+                rid, data = pairs[i]
+                if hi is not None and not rid < hi:     # Rid is past the leaf.
+                    break
+                pos += 1
+                lo = bisect_left(keys, rid, lo)    # The run is sorted, so each
+                if lo < len(keys) and keys[lo] == rid:
+                    continue                   # Already in tree (or in batch).
+                keys.insert(lo, rid)          # insert only shifts the original
+                ptrs.insert(lo, data)                       # keys right of it.
+                self.size += 1
+                if bloom is not None:
+                    self.bloom_add(rid)
+                result[i] = True
+            if self.order_stats:
+                self.weigh(leaf)
+                self.bump(leaf.parent, len(keys) - before,
+                          leaf.total - before_total)
+            if len(keys) >= self.deg:
+                self.split_many(leaf)
+        return result
+
+    def split_many(self, node):
+        """ Split an overfull node into as many siblings as it needs. """
+        grew = not node.parent
+        if not node.parent:       # Make a parent if this node didn't have one.
+            node.parent = self.node_class(is_leaf=False)
+            node.parent.ptrs.append(node)
+            node.slot = 0
+        if node is self.root:
+            self.root = node.parent              # Grow the height of the tree.
+        keys, ptrs = node.keys, node.ptrs
+        if node.is_leaf:
+            pieces = -(-len(keys) // (self.deg - 1))
+            bounds = [len(keys) * j // pieces for j in range(pieces + 1)]
+            seps = node.key_array(keys[b] for b in bounds[1:-1])
+        else:
+            pieces = -(-len(ptrs) // self.deg)
+            bounds = [len(ptrs) * j // pieces for j in range(pieces + 1)]
+            seps = node.key_array(keys[b - 1] for b in bounds[1:-1])
+        siblings = []
+        for a, b in zip(bounds[1:], bounds[2:]):
+            sibling = self.node_class(is_leaf=node.is_leaf)
+            sibling.parent = node.parent
+            sibling.ptrs = ptrs[a:b]
+            if node.is_leaf:
+                sibling.keys = keys[a:b]
+            else:
+                sibling.keys = keys[a:b - 1]
+                sibling.adopt()
+            siblings.append(sibling)
+        node.ptrs = ptrs[:bounds[1]]
+        node.keys = keys[:bounds[1]] if node.is_leaf else keys[:bounds[1] - 1]
+        if node.is_leaf:                            # Link leaf nodes together.
+            chain = [node] + siblings
+            siblings[-1].next = node.next
+            if node.next:
+                node.next.prev = siblings[-1]
+            for left, right in zip(chain, siblings):
+                left.next = right
+                right.prev = left
+        p = node.parent
+        p.keys[node.slot:node.slot] = seps
+        p.ptrs[node.slot + 1:node.slot + 1] = siblings
+        p.reindex(node.slot + 1)
+        if self.order_stats:
+            for piece in [node] + siblings:
+                self.weigh(piece)
+            if grew:
+                self.weigh(p)
+        if len(p.keys) >= self.deg:
+            self.split_many(p)                       # Propogate split upwards.
         return None
 
     def delete(self, rid):
         if not self.root:                             # Check if tree is empty.
             return False
-        if rid not in self.rid_set:               # Check if rid exist in tree.
+        if self.bloom is not None and rid not in self.bloom:
+            return False                              # Definitely not in tree.
+        node = self.seek(rid)
+        rid_index = node.get_index_of(rid)
+        if rid_index == NOT_FOUND:                # Check if rid exist in tree.
             return False
-        node, inode = self.find_nodes(rid)    # These nodes might have the rid.
-        rid_index = node.get_index_of(rid) 
-        if rid_index == -1:                          # Check if rid is in node.
-            raise Exception("Rid not found where it was supposed to be.")
+        if self.order_stats:
+            self.bump(node, -1, -node.ptrs[rid_index] if self.sums else 0)
         node.pop(rid_index)                  # Remove the record from the tree.
-        self.rid_set.remove(rid)
-        self.merge_leaf(rid, node, inode)               # restructure the tree.
+        self.size -= 1
+        if self.relaxed:
+            self.defer(node)
+        else:
+            self.merge_leaf(node)                       # restructure the tree.
         return True
 
-    def merge_leaf(self, rid, node, inode):
-        if node is self.root and node.size == 0:      # Check if tree is empty.
+    def merge_leaf(self, node):
+        if node is self.root and not node.keys:       # Check if tree is empty.
             self.root = None
+            self.finger = None
             return
         if node is self.root:
             return
-        if not inode and node.size >= self.min_node_size:      # Simple delete.
-            return
-        if node.size >= self.min_node_size:             # Almost simple delete.
-            k = inode.get_index_of(rid)
-            inode.children[k][RID_INDEX] = node.get_min("r")
+        if len(node.keys) >= self.min_node_size:               # Simple delete.
             return
+        self.finger = None                       # The leaf may be merged away.
         p = node.parent
-        ls, rs = node.get_siblings() 
-        if ls and ls.size > self.min_node_size:        # Case I: steal from ls.
-            srid = ls.get_max("r")                   # "Stolen" ls' node's rid.
-            sdat = ls.get_max("d")                  # "Stolen" ls' node's data.
-            ls.pop(-2)                          # Pop(-2) to pop maximum child.
-            node.add(srid, sdat)
-        elif rs and rs.size > self.min_node_size:     # Case II: steal from rs.
-            srid = rs.get_min("r")                   # "Stolen" rs' node's rid.
-            sdat = rs.get_min("d")
-            rs.pop()                              # Pop() to pop minimum child.
-            node.add(srid, sdat)
-            k = p.get_index_of(node)
-            p.children[k][RID_INDEX] = rs.get_min("r")  # Update key in parent.
+        k = node.slot
+        ls, rs = node.get_siblings()
+        if ls and len(ls.keys) > self.min_node_size:   # Case I: steal from ls.
+            node.keys.insert(0, ls.keys.pop())        # Pop ls' maximum child.
+            node.ptrs.insert(0, ls.ptrs.pop())
+            p.keys[k - 1] = node.keys[0]                # Update key in parent.
+        elif rs and len(rs.keys) > self.min_node_size:     # Case II: steal rs.
+            node.keys.append(rs.keys.pop(0))          # Pop rs' minimum child.
+            node.ptrs.append(rs.ptrs.pop(0))
+            p.keys[k] = rs.keys[0]                      # Update key in parent.
         elif ls:                                     # Case III: merge with ls.
-            for i in range(ls.size):             # cp children from ls to node.
-                node.add(ls.children[i][RID_INDEX], ls.children[i][PTR_INDEX])
-            node.prev = ls.prev                  # Detach ls from other leaves.
-            if node.prev:                         
-                node.prev.next = node            # Detach ls from other leaves.
-            k = p.get_index_of(ls)
-            p.pop(k)                                   # Detach ls from parent.
+            ls.keys.extend(node.keys)            # cp children from node to ls.
+            ls.ptrs.extend(node.ptrs)
+            ls.next = node.next                # Detach node from other leaves.
+            if ls.next:
+                ls.next.prev = ls
+            del p.keys[k - 1]                        # Detach node from parent.
+            del p.ptrs[k]
+            p.reindex(k)
         elif rs:                                      # Case IV: merge with rs.
-            for i in range(rs.size):             # cp children from rs to node.
-                node.add(rs.children[i][RID_INDEX], rs.children[i][PTR_INDEX])
+            node.keys.extend(rs.keys)            # cp children from rs to node.
+            node.ptrs.extend(rs.ptrs)
             node.next = rs.next                  # Detach rs from other leaves.
             if node.next:
-                node.next.prev = node            # Detach rs from other leaves.
-            node_index = p.get_index_of(node) 
-            srid = p.children[node_index + 1][RID_INDEX] # Steal rs search rid.
-            p.children[node_index][RID_INDEX] = srid       # Update parent rid.
-            p.pop(node_index + 1)        # Remove connection from parent to rs.
+                node.next.prev = node
+            del p.keys[k]                              # Detach rs from parent.
+            del p.ptrs[k + 1]
+            p.reindex(k + 1)
         else:
             raise Exception("Leaf does not have any siblings")
-        if inode and inode.get_index_of(rid) != NOT_FOUND: # Complicated sorry.
-            k = inode.get_index_of(rid)
-            inode.children[k][RID_INDEX] = node.get_min("r")
+        if self.order_stats:
+            self.weigh(ls, node, rs)
         return self.merge_internal(p)
 
     def merge_internal(self, node):
-        if node == self.root and node.size == 0:      # Check if root is empty.
-            self.root = node.children[0][PTR_INDEX]
+        if node is self.root and not node.keys:       # Check if root is empty.
+            self.root = node.ptrs[0]
+            self.root.parent = None
+            self.root.slot = 0
             return
-        if node == self.root:        # Ignore root (as long as it's not empty).
+        if node is self.root:        # Ignore root (as long as it's not empty).
             return
-        if node.size >= self.min_node_size:     # Pass if node is large enough.
+        if len(node.keys) >= self.min_node_size:       # Pass if node is large.
             return
         p = node.parent
-        ls, rs = node.get_siblings() 
-        if ls and ls.size > self.min_node_size:        # Case I: steal from ls.
-            ls_index = p.get_index_of(ls)
-            prid = p.children[ls_index][RID_INDEX]         # Demote parent rid.
-            lschild = ls.get_max("p")                    # Steal child from ls.
-            node.add(prid, lschild)          # Node inherits (rid, child) pair.
-            lschild.parent = node # Make sure stolen child knows its new daddy.
-            lsrid = ls.get_max("r")
-            p.children[ls_index][RID_INDEX] = lsrid       # Promote ls max rid.
-            ls.pop(-1)                # Pop -1 on internal node to pop max key.
-            ls.children[-1][RID_INDEX] = float('inf')  # 'inf' for new max key.
-        elif rs and rs.size > self.min_node_size:     # Case II: steal from rs.
-            n_index = p.get_index_of(node)
-            prid = p.children[n_index][RID_INDEX] 
-            node.children[-1][RID_INDEX] = prid            # Demote parent rid.
-            rschild = rs.get_min("p")                      
-            node.add(float('inf'), rschild)              # Steal child from rs.
-            rschild.parent = node                      # Update child's parent.
-            rsrid = rs.get_min("r") 
-            p.children[n_index][RID_INDEX] = rsrid        # Promote rs min rid.
-            rs.pop()                                     # Remove rs min child.
+        k = node.slot
+        ls, rs = node.get_siblings()
+        if ls and len(ls.keys) > self.min_node_size:   # Case I: steal from ls.
+            node.keys.insert(0, p.keys[k - 1])             # Demote parent rid.
+            node.ptrs.insert(0, ls.ptrs.pop())           # Steal child from ls.
+            p.keys[k - 1] = ls.keys.pop()                 # Promote ls max rid.
+            node.adopt()
+        elif rs and len(rs.keys) > self.min_node_size:     # Case II: steal rs.
+            node.keys.append(p.keys[k])                    # Demote parent rid.
+            node.ptrs.append(rs.ptrs.pop(0))             # Steal child from rs.
+            p.keys[k] = rs.keys.pop(0)                    # Promote rs min rid.
+            node.adopt(len(node.ptrs) - 1)
+            rs.reindex()
         elif ls:                                     # Case III: merge with ls.
-            ls_index = p.get_index_of(ls)
-            prid = p.children[ls_index][RID_INDEX]
-            ls.children[-1][RID_INDEX] = prid        # Demote parent rid to ls.
-            p.pop(ls_index)                                # Remove ref. to ls.
-            for i in range(ls.size + 1):         # cp children from ls to node.
-                node.add(ls.children[i][RID_INDEX], ls.children[i][PTR_INDEX])
-                if ls.children[i][PTR_INDEX]:
-                    ls.children[i][PTR_INDEX].parent = node # Update child's p.
+            start = len(ls.ptrs)
+            ls.keys.append(p.keys[k - 1])            # Demote parent rid to ls.
+            ls.keys.extend(node.keys)            # cp children from node to ls.
+            ls.ptrs.extend(node.ptrs)
+            ls.adopt(start)
+            del p.keys[k - 1]                            # Remove ref. to node.
+            del p.ptrs[k]
+            p.reindex(k)
         else:                                         # Case VI: merge with rs.
-            n_index = p.get_index_of(node)
-            prid = p.children[n_index][RID_INDEX]
-            node.children[-1][RID_INDEX] = prid    # Demote parent rid to node.
-            rs_index = p.get_index_of(rs)
-            p.children[rs_index][PTR_INDEX] = node    # node become the rchild. 
-            p.pop(n_index)                    # remove ref. to parent's lchild.
-            for i in range(rs.size + 1):         # cp children from rs to node.
-                node.add(rs.children[i][RID_INDEX], rs.children[i][PTR_INDEX])
-                if rs.children[i][PTR_INDEX]:
-                    rs.children[i][PTR_INDEX].parent = node # Update child's p.
+            start = len(node.ptrs)
+            node.keys.append(p.keys[k])            # Demote parent rid to node.
+            node.keys.extend(rs.keys)            # cp children from rs to node.
+            node.ptrs.extend(rs.ptrs)
+            node.adopt(start)
+            del p.keys[k]                                  # Remove ref. to rs.
+            del p.ptrs[k + 1]
+            p.reindex(k + 1)
+        if self.order_stats:
+            self.weigh(ls, node, rs)
         return self.merge_internal(p)
-    
+
+    def delete_many(self, rids):
+        """ Delete a batch of rids.
+
+        Rids are sorted and grouped by leaf like insert_many; each touched
+        leaf is rebalanced once. Returns one flag per rid, in input order,
+        with the same meaning as delete's return value.
+        """
+        rids = list(rids)
+        order = sorted(range(len(rids)), key=lambda i: rids[i])
+        result = [False] * len(rids)
+        pos = 0
+        leaf = None
+        while pos < len(order) and self.root:
+            leaf, hi = self.find_fence(rids[order[pos]], leaf)
+            keys = leaf.keys
+            doomed = set()                      # Leaf positions to be removed.
+            lo = 0
+            while pos < len(order):
+                i = order[pos]
+                rid = rids[i]
+                if hi is not None and not rid < hi:     # Rid is past the leaf.
+                    break
+                pos += 1
+                lo = bisect_left(keys, rid, lo)
+                if lo < len(keys) and keys[lo] == rid and lo not in doomed:
+                    doomed.add(lo)
+                    result[i] = True
+            if not doomed:
+                continue
+            self.size -= len(doomed)
+            if self.order_stats:
+                gone = sum(leaf.ptrs[j] for j in doomed) if self.sums else 0
+                self.bump(leaf, -len(doomed), -gone)
+            keep = [j for j in range(len(keys)) if j not in doomed]
+            leaf.keys = leaf.key_array(keys[j] for j in keep)
+            leaf.ptrs = [leaf.ptrs[j] for j in keep]
+            if self.relaxed:
+                self.defer(leaf)
+            elif not keep or len(keep) < self.min_node_size:
+                self.rebalance(leaf)
+                leaf = None               # The leaf may have been merged away.
+        return result
+
+    def delete_range(self, lo, hi):
+        """ Delete every rid with lo <= rid <= hi; return how many went.
+
+        The leaves holding lo and hi are trimmed and linked to each other,
+        and every subtree strictly between the two root-to-leaf paths is
+        unlinked from its parent in one step, so only the two boundary
+        paths are restructured. With order_stats the number deleted comes
+        from subtree counts; otherwise the cut leaves are counted along
+        the leaf chain, which still never touches a rid one by one.
+        """
+        if not self.root or hi < lo:
+            return 0
+        self.finger = None
+        left, right = self.find_leaf(lo), self.find_leaf(hi)
+        i = bisect_left(left.keys, lo)
+        j = bisect_right(right.keys, hi)
+        if left is right:
+            if i >= j:
+                return 0
+            if self.order_stats:
+                total = sum(left.ptrs[i:j]) if self.sums else 0
+                self.bump(left, i - j, -total)
+            del left.keys[i:j]
+            del left.ptrs[i:j]
+            self.size -= j - i
+            self.rebalance(left)
+            return j - i
+        if self.order_stats:
+            before = self.root.count
+        else:
+            before = len(left.keys) - i + j
+            node = left.next
+            while node is not right:                # Count the leaves we drop.
+                before += len(node.keys)
+                node = node.next
+        del left.keys[i:]
+        del left.ptrs[i:]
+        del right.keys[:j]
+        del right.ptrs[:j]
+        left.next = right                          # Unlink the leaves between.
+        right.prev = left
+        a, b = left, right
+        while a.parent is not b.parent:      # Cut everything right of the left
+            pa, pb = a.parent, b.parent      # path and left of the right path.
+            del pa.keys[a.slot:]
+            del pa.ptrs[a.slot + 1:]
+            del pb.keys[:b.slot]
+            del pb.ptrs[:b.slot]
+            pb.reindex()
+            if self.order_stats:
+                self.weigh(a, b)
+            a, b = pa, pb
+        p = a.parent                # The paths meet: cut the children between.
+        del p.keys[a.slot:b.slot - 1]
+        del p.ptrs[a.slot + 1:b.slot]
+        p.reindex(a.slot + 1)
+        if self.order_stats:
+            self.weigh(a, b)
+            while p is not None:
+                self.weigh(p)
+                p = p.parent
+            removed = before - self.root.count
+        else:
+            removed = before
+        self.size -= removed
+        self.rebalance(left)
+        if self.attached(right):
+            self.rebalance(right)
+        return removed
+
+    def rebalance(self, node):
+        """ Restore occupancy of a node that may be arbitrarily underfull.
+
+        Unlike merge_leaf/merge_internal, which fix a node that is one entry
+        short, this pools the node with a sibling and either merges the two
+        or splits the pool evenly, then walks up to the parent.
+        """
+        self.finger = None
+        while node is not None:
+            if node is self.root:
+                while not node.is_leaf and not node.keys:      # Collapse root.
+                    node = node.ptrs[0]
+                    node.parent = None
+                    node.slot = 0
+                self.root = node if node.keys or not node.is_leaf else None
+                return None
+            if len(node.keys) >= self.min_node_size:
+                node = node.parent
+                continue
+            p = node.parent
+            ls, rs = node.get_siblings()
+            if not ls and not rs:           # Only child; fix the parent first.
+                self.rebalance(p)
+                if node.parent is None and node is not self.root:
+                    return None        # The root collapsed onto an empty leaf.
+                continue
+            left, right = (ls, node) if ls else (node, rs)
+            j = left.slot
+            if left.is_leaf:
+                keys = left.keys + right.keys
+                ptrs = left.ptrs + right.ptrs
+                merge = len(keys) < self.deg
+            else:
+                keys = left.keys + p.keys[j:j + 1] + right.keys
+                ptrs = left.ptrs + right.ptrs
+                merge = len(ptrs) <= self.deg
+            if merge:                             # Pool fits in a single node.
+                left.keys, left.ptrs = keys, ptrs
+                if left.is_leaf:
+                    left.next = right.next
+                    if left.next:
+                        left.next.prev = left
+                else:
+                    left.adopt()
+                del p.keys[j]
+                del p.ptrs[j + 1]
+                p.reindex(j + 1)
+                if self.order_stats:
+                    self.weigh(left)
+                node = left                         # Might still be underfull.
+                continue
+            half = len(ptrs) // 2                      # Split the pool evenly.
+            if left.is_leaf:
+                left.keys, right.keys = keys[:half], keys[half:]
+                p.keys[j] = right.keys[0]
+            else:
+                left.keys, right.keys = keys[:half - 1], keys[half:]
+                p.keys[j] = keys[half - 1]
+            left.ptrs, right.ptrs = ptrs[:half], ptrs[half:]
+            if not left.is_leaf:
+                left.adopt()
+                right.adopt()
+            if self.order_stats:
+                self.weigh(left, right)
+            node = p
+        return None
+
+    def defer(self, leaf):
+        """ Note an underfull leaf for compact() instead of restructuring. """
+        if leaf is self.root:
+            if not leaf.keys:                              # The tree is empty.
+                self.root = None
+                self.finger = None
+        elif len(leaf.keys) < self.min_node_size:
+            self.underflow.add(leaf)
+
+    def attached(self, node):
+        """ Return whether node is still reachable from the root. """
+        while node.parent is not None:
+            p = node.parent
+            if node.slot >= len(p.ptrs) or p.ptrs[node.slot] is not node:
+                return False
+            node = p
+        return node is self.root
+
+    def compact(self, limit=None):
+        """ Rebalance the leaves that relaxed deletes left underfull.
+
+        At most `limit` leaves are fixed per call (all of them by default),
+        so compaction can be spread over many small steps. Leaves that have
+        refilled or been merged away since are dropped for free. Returns
+        the number of leaves still pending.
+        """
+        fixed = 0
+        while self.underflow and (limit is None or fixed < limit):
+            leaf = self.underflow.pop()
+            if len(leaf.keys) >= self.min_node_size or \
+                    not self.attached(leaf):
+                continue
+            self.rebalance(leaf)
+            fixed += 1
+        return len(self.underflow)
+
     def search(self, rid):
-        node, _ = self.find_nodes(rid)
-        k = node.get_index_of(rid)
-        return node.children[k][PTR_INDEX]
+        if not self.root:                             # Check if tree is empty.
+            return None
+        if self.bloom is not None and rid not in self.bloom:
+            return None                               # Definitely not in tree.
+        node = self.seek(rid)
+        keys = node.keys
+        k = bisect_left(keys, rid)
+        if k < len(keys) and keys[k] == rid:
+            return node.ptrs[k]
+        return None
+
+    def seek(self, rid):
+        """ Return the leaf for rid. With finger search on, skip the descent
+        when the finger (the last leaf used) must hold it: rid lies between
+        the leaf's first and last rids, or past either end of the leaf chain.
+        """
+        node = self.finger
+        if node is not None and node.keys:
+            keys = node.keys
+            if (node.prev is None or not rid < keys[0]) and \
+                    (node.next is None or not keys[-1] < rid):
+                self.finger_hits += 1
+                return node
+        node = self.root
+        while not node.is_leaf:                          # Inlined find_leaf().
+            node = node.ptrs[bisect_right(node.keys, rid)]
+        if self.finger_search:                    # Off, the finger stays None.
+            self.finger_misses += 1
+            self.finger = node
+        return node
+
+    # ----------------------------------------------------------------------- #
+    #                              NEAREST KEYS                               #
+    # ----------------------------------------------------------------------- #
+
+    def floor(self, rid):
+        """ Return the largest rid in the tree <= rid, or None. """
+        return self.before(rid, bisect_right)
+
+    def lower(self, rid):
+        """ Return the largest rid in the tree < rid, or None. """
+        return self.before(rid, bisect_left)
+
+    def ceiling(self, rid):
+        """ Return the smallest rid in the tree >= rid, or None. """
+        return self.after(rid, bisect_left)
+
+    def higher(self, rid):
+        """ Return the smallest rid in the tree > rid, or None. """
+        return self.after(rid, bisect_right)
+
+    def before(self, rid, seek):
+        if not self.root:                             # Check if tree is empty.
+            return None
+        node = self.seek(rid)
+        i = seek(node.keys, rid)
+        if i:
+            return node.keys[i - 1]
+        node = node.prev
+        while node is not None and not node.keys:        # Skip emptied leaves.
+            node = node.prev
+        return node.keys[-1] if node is not None else None
+
+    def after(self, rid, seek):
+        if not self.root:                             # Check if tree is empty.
+            return None
+        node = self.seek(rid)
+        i = seek(node.keys, rid)
+        if i < len(node.keys):
+            return node.keys[i]
+        node = node.next
+        while node is not None and not node.keys:        # Skip emptied leaves.
+            node = node.next
+        return node.keys[0] if node is not None else None
+
+    def min(self):
+        """ Return the smallest rid in the tree, or None if it is empty. """
+        node = self.first_leaf() if self.root else None
+        while node is not None and not node.keys:        # Skip emptied leaves.
+            node = node.next
+        return node.keys[0] if node is not None else None
+
+    def max(self):
+        """ Return the largest rid in the tree, or None if it is empty. """
+        node = self.last_leaf() if self.root else None
+        while node is not None and not node.keys:        # Skip emptied leaves.
+            node = node.prev
+        return node.keys[-1] if node is not None else None
+
+    def nearest(self, rid, k=1):
+        """ Return the k rids closest to rid, nearest first.
+
+        Two scans start at rid, one down and one up the leaf chain, and
+        are merged by distance; a tie goes to the smaller rid. Costs
+        O(log n + k). Rids must support subtraction.
+        """
+        below = self.items(hi=rid, reverse=True)
+        above = self.items(lo=rid, inclusive=(False, True))
+        a, b = next(below, None), next(above, None)
+        result = []
+        while len(result) < k and (a is not None or b is not None):
+            if b is None or a is not None and rid - a[0] <= b[0] - rid:
+                result.append(a[0])
+                a = next(below, None)
+            else:
+                result.append(b[0])
+                b = next(above, None)
+        return result
+
+    # ----------------------------------------------------------------------- #
+    #                            ORDER STATISTICS                             #
+    # ----------------------------------------------------------------------- #
+
+    def weigh(self, *nodes):
+        """ Recount the subtree of each node from its children. """
+        for node in nodes:
+            if node is None:
+                continue
+            if node.is_leaf:
+                node.count = len(node.keys)
+                if self.sums:
+                    node.total = sum(node.ptrs)
+            else:
+                node.count = sum(child.count for child in node.ptrs)
+                if self.sums:
+                    node.total = sum(child.total for child in node.ptrs)
+
+    def bump(self, node, count, total=0):
+        """ Add to the count (and total) of node and all its ancestors. """
+        while node is not None:
+            node.count += count
+            node.total += total
+            node = node.parent
+
+    def require_order_stats(self):
+        if not self.order_stats:
+            raise ValueError("Tree was built without order_stats=True")
+
+    def prefix(self, rid, inclusive=False):
+        """ Return the (count, total) of the rids < rid (<= if inclusive). """
+        count = total = 0
+        node = self.root
+        if node is None:
+            return count, total
+        while not node.is_leaf:
+            i = bisect_right(node.keys, rid)
+            for child in node.ptrs[:i]:           # Whole subtrees left of rid.
+                count += child.count
+                total += child.total
+            node = node.ptrs[i]
+        i = (bisect_right if inclusive else bisect_left)(node.keys, rid)
+        count += i
+        if self.sums:
+            total += sum(node.ptrs[:i])
+        return count, total
+
+    def rank(self, rid):
+        """ Return the number of rids less than rid in O(deg log n). """
+        self.require_order_stats()
+        return self.prefix(rid)[0]
+
+    def select(self, k):
+        """ Return the k-th smallest rid (0-based; negative k counts back). """
+        self.require_order_stats()
+        if k < 0:
+            k += self.size
+        if not 0 <= k < self.size:
+            raise IndexError("select index out of range")
+        node = self.root
+        while not node.is_leaf:
+            for child in node.ptrs:                 # Skip whole subtrees left.
+                if k < child.count:
+                    break
+                k -= child.count
+            node = child
+        return node.keys[k]
+
+    def span(self, lo, hi, inclusive):
+        """ Return the (count, total) of the rids between lo and hi. """
+        if not self.root:
+            return 0, 0
+        if lo is None:
+            low = (0, 0)
+        else:
+            low = self.prefix(lo, not inclusive[0])
+        if hi is None:
+            high = (self.root.count, self.root.total)
+        else:
+            high = self.prefix(hi, inclusive[1])
+        if high[0] <= low[0]:                        # Empty or inverted range.
+            return 0, 0
+        return high[0] - low[0], high[1] - low[1]
+
+    def count_range(self, lo=None, hi=None, inclusive=(True, True)):
+        """ Count the rids between lo and hi without scanning the leaves. """
+        self.require_order_stats()
+        return self.span(lo, hi, inclusive)[0]
+
+    def sum_range(self, lo=None, hi=None, inclusive=(True, True)):
+        """ Sum the data of the rids between lo and hi (needs sums=True). """
+        if not self.sums:
+            raise ValueError("Tree was built without sums=True")
+        return self.span(lo, hi, inclusive)[1]
+
+    # ----------------------------------------------------------------------- #
+    #                                 QUERIES                                 #
+    # ----------------------------------------------------------------------- #
+
+    def search_many(self, rids, default=None):
+        """ Look up a batch of rids; returns their data in input order.
+
+        The distinct rids are sorted and walked leaf by leaf like
+        insert_many, so rids that share a subtree share its descent and
+        each leaf is visited once. Hits are collected in a dict (a leaf
+        that many rids fall into is copied whole, at C speed) and read back
+        in input order by dict probes, with `default` for missing rids.
+        A NumPy array (anything with tolist()) is accepted as well.
+        """
+        if hasattr(rids, "tolist"):
+            rids = rids.tolist()
+        rids = list(rids)
+        batch = sorted(set(rids))
+        found = {}
+        pos = 0
+        leaf = None
+        while pos < len(batch) and self.root:
+            leaf, hi = self.find_fence(batch[pos], leaf)
+            end = len(batch) if hi is None else bisect_left(batch, hi, pos)
+            keys, ptrs = leaf.keys, leaf.ptrs
+            if 4 * (end - pos) >= len(keys):        # Dense run: copy the leaf.
+                found.update(zip(keys, ptrs))
+            else:                            # Sparse run: bisect for each rid.
+                for rid in batch[pos:end]:
+                    k = bisect_left(keys, rid)
+                    if k < len(keys) and keys[k] == rid:
+                        found[rid] = ptrs[k]
+            pos = end
+        return list(map(found.get, rids, repeat(default, len(rids))))
+
+    def find_leaf(self, rid):
+        node = self.root
+        while not node.is_leaf:     # Traverse down the tree to the right leaf.
+            node = node.ptrs[bisect_right(node.keys, rid)]    # Follow the ptr.
+        return node
+
+    def find_fence(self, rid, start=None):
+        """ Return the leaf for rid and the separator bounding it on the right
+        (None for the rightmost leaf).
+
+        Batches walk in ascending order, so when `start` (the previous leaf)
+        is given the descent only climbs as far as the first ancestor whose
+        range still holds rid instead of restarting from the root.
+        """
+        node = start or self.root
+        hi = None                           # Smallest separator right of path.
+        while node.parent is not None:
+            p = node.parent
+            if node.slot < len(p.keys) and rid < p.keys[node.slot]:
+                hi = p.keys[node.slot]
+                break
+            node = p
+        while not node.is_leaf:
+            i = bisect_right(node.keys, rid)
+            if i < len(node.keys):
+                hi = node.keys[i]
+            node = node.ptrs[i]
+        return node, hi
 
     def find_nodes(self, rid):
         if not self.root:                             # Check if tree is empty.
@@ -273,51 +1008,231 @@ class BPlusTree():
         node = self.root
         inode = None
         while not node.is_leaf:     # Traverse down the tree to the right leaf.
-            for i in range(node.size + 1):
-                if rid < node.children[i][RID_INDEX]:
-                    node = node.children[i][PTR_INDEX]        # Follow the ptr.
-                    break 
-                if rid == node.children[i][RID_INDEX]:
-                    inode = node  # Inode has the target rid, but isn't a leaf.
+            i = bisect_right(node.keys, rid)
+            if i and node.keys[i - 1] == rid:
+                inode = node  # Inode has the target rid, but isn't a leaf.
+            node = node.ptrs[i]
         return (node, inode)
 
     def range(self, rid_1, rid_2):
         if not self.root:                             # Check if tree is empty.
             return []
         result = []
-        node = self.root                                       # Start at root.
-        while not node.is_leaf:          # Traverse to the very left leaf node.
-            node = node.children[0][PTR_INDEX]
-        while node and node.get_max('d') < rid_1: 
-            node = node.next                 # Quickly skip nodes out of range.
+        node = self.find_leaf(rid_1)         # Seek straight to the first leaf.
+        i = bisect_left(node.keys, rid_1)
         while node is not None:
-            for i in range(node.size):
-                rid = node.children[i][RID_INDEX]
-                if rid < rid_1: 
-                    continue                # skip if rid is less than minimum.
-                if rid > rid_2:
-                    return result      # return if rid is greater than maximum.
-                result.append(rid)
+            keys = node.keys
+            j = bisect_right(keys, rid_2)
+            result.extend(keys[i:j])
+            if j < len(keys):
+                return result          # return if rid is greater than maximum.
             node = node.next
+            i = 0
         return result
 
+    def items(self, lo=None, hi=None, reverse=False, inclusive=(True, True),
+              limit=None, offset=0):
+        """ Lazily yield (rid, data) pairs with lo <= rid <= hi.
+
+        A bound of None is open. `inclusive` says whether each bound is
+        itself included. The scan seeks straight to the first qualifying
+        leaf and then follows the next (or prev, when `reverse`) links, so
+        it costs O(log n + offset + k). Mutating the tree while iterating
+        gives undefined results.
+        """
+        scan = self.scan_desc if reverse else self.scan_asc
+        pairs = scan(lo, hi, inclusive)
+        if offset or limit is not None:
+            stop = None if limit is None else offset + limit
+            pairs = islice(pairs, offset, stop)
+        return pairs
+
+    def scan_asc(self, lo, hi, inclusive):
+        if not self.root:                             # Check if tree is empty.
+            return
+        if lo is None:
+            node = self.first_leaf()
+            i = 0
+        else:
+            node = self.find_leaf(lo)
+            seek = bisect_left if inclusive[0] else bisect_right
+            i = seek(node.keys, lo)
+        stop = bisect_right if inclusive[1] else bisect_left
+        while node is not None:
+            keys = node.keys
+            j = len(keys) if hi is None else stop(keys, hi)
+            yield from zip(keys[i:j], node.ptrs[i:j])
+            if j < len(keys):
+                return                       # The rest of the leaf is past hi.
+            node = node.next
+            i = 0
+
+    def scan_desc(self, lo, hi, inclusive):
+        if not self.root:                             # Check if tree is empty.
+            return
+        if hi is None:
+            node = self.last_leaf()
+            j = len(node.keys)
+        else:
+            node = self.find_leaf(hi)
+            seek = bisect_right if inclusive[1] else bisect_left
+            j = seek(node.keys, hi)
+        stop = bisect_left if inclusive[0] else bisect_right
+        while node is not None:
+            keys = node.keys
+            i = 0 if lo is None else stop(keys, lo)
+            yield from zip(reversed(keys[i:j]), reversed(node.ptrs[i:j]))
+            if i > 0:
+                return                     # The rest of the leaf is before lo.
+            node = node.prev
+            if node is not None:
+                j = len(node.keys)
+
+    def first_leaf(self):
+        node = self.root
+        while not node.is_leaf:          # Traverse to the very left leaf node.
+            node = node.ptrs[0]
+        return node
+
+    def last_leaf(self):
+        node = self.root
+        while not node.is_leaf:         # Traverse to the very right leaf node.
+            node = node.ptrs[-1]
+        return node
+
     def inorder(self):
         if not self.root:                             # Check if tree is empty.
             return []
         result = []
-        node = self.root                                       # Start at root.
-        while not node.is_leaf:          # Traverse to the very left leaf node.
-            node = node.children[0][PTR_INDEX]
+        node = self.first_leaf()
         while node is not None:             # Use next ptr to get inorder list.
-            for i in range(node.size):
-                result.append(node.children[i][RID_INDEX])
+            result.extend(node.keys)
             node = node.next
         return result
 
+    def iter_inorder(self):
+        if not self.root:                             # Check if tree is empty.
+            return
+        node = self.first_leaf()
+        while node is not None:                  # Use next ptr to stream rids.
+            yield from node.keys
+            node = node.next
+
+    def bloom_add(self, rid):
+        if self.bloom.added < self.bloom.capacity:
+            self.bloom.add(rid)
+        else:                      # Filter is full: rebuild it twice as large.
+            self.rebuild_bloom()
+
+    def rebuild_bloom(self):
+        """ Size a new filter for the current rids, dropping stale bits. """
+        self.bloom = BloomFilter(max(BLOOM_MIN, 2 * self.size),
+                                 self.bloom_error)
+        for rid in self.iter_inorder():
+            self.bloom.add(rid)
+
+    def freeze(self, fanout=None):
+        """ Return an immutable FrozenBPlusTree copy laid out for lookups. """
+        from .frozen import FrozenBPlusTree
+        return FrozenBPlusTree.from_items(self.items(), fanout or self.deg)
+
+    # ----------------------------------------------------------------------- #
+    #                           MEMORY AND STATS                              #
+    # ----------------------------------------------------------------------- #
+
+    def iter_nodes(self):
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            yield node
+            if not node.is_leaf:
+                stack.extend(node.ptrs)
+
+    def memory_usage(self):
+        """ Return the bytes held by the tree, by category.
+
+        keys:      the rid objects stored in the leaves (or, for int64
+                   keys, the bytes of the leaves' key arrays).
+        values:    the data objects stored in the leaves (shallow size).
+        nodes:     the node objects themselves.
+        structure: the keys/ptrs arrays of every node, including the
+                   separators and child pointers of internal nodes.
+        bloom:     the bloom filter, if there is one.
+
+        Sizes come from sys.getsizeof, and an object referenced from
+        several places (a shared value, a small cached int) counts once.
+        """
+        usage = dict.fromkeys(("keys", "values", "nodes", "structure",
+                               "bloom"), 0)
+        seen = set()
+        for node in self.iter_nodes():
+            usage["nodes"] += getsizeof(node)
+            usage["structure"] += getsizeof(node.keys) + getsizeof(node.ptrs)
+            if not node.is_leaf:
+                continue
+            keys = node.keys
+            if isinstance(keys, list):
+                for rid in keys:
+                    if id(rid) not in seen:
+                        seen.add(id(rid))
+                        usage["keys"] += getsizeof(rid)
+            else:
+                nbytes = keys.itemsize * len(keys)   # Unboxed keys live in the
+                usage["keys"] += nbytes              # array, not in structure.
+                usage["structure"] -= nbytes
+            for data in node.ptrs:
+                if id(data) not in seen:
+                    seen.add(id(data))
+                    usage["values"] += getsizeof(data)
+        if self.bloom is not None:
+            usage["bloom"] = getsizeof(self.bloom) + getsizeof(self.bloom.bits)
+        usage["total"] = sum(usage.values())
+        return usage
+
+    def stats(self):
+        """ Return the shape, occupancy and memory usage of the tree. """
+        leaves = inodes = height = underfull = empty = 0
+        node = self.root
+        while node is not None:
+            height += 1
+            node = None if node.is_leaf else node.ptrs[0]
+        for node in self.iter_nodes():
+            if node.is_leaf:
+                leaves += 1
+                if node is not self.root:
+                    underfull += len(node.keys) < self.min_node_size
+                    empty += not node.keys
+            else:
+                inodes += 1
+        memory = self.memory_usage()
+        capacity = leaves * (self.deg - 1)
+        return {
+            "size": self.size,
+            "deg": self.deg,
+            "height": height,
+            "leaves": leaves,
+            "inodes": inodes,
+            "leaf_fill": self.size / capacity if capacity else 0,
+            "bloom": self.bloom is not None,
+            "memory": memory,
+            "bytes_per_rid": memory["total"] / self.size if self.size else 0,
+            "finger_hits": self.finger_hits,
+            "finger_misses": self.finger_misses,
+            "underfull_leaves": underfull,
+            "empty_leaves": empty,
+            "compact_pending": len(self.underflow),
+        }
+
     # ----------------------------------------------------------------------- #
     #                             TREE DEV TOOLS                              #
     # ----------------------------------------------------------------------- #
 
+    def instrument(self, hook=None):
+        """ Count descents, splits, merges and per-op latency until the
+        returned Instrumentation is detached (see src/instrument.py).
+        """
+        return Instrumentation(self, hook)
+
     def inorder_slow(self):
         if not self.root:
             return []
@@ -325,11 +1240,10 @@ class BPlusTree():
         result = []
         while queue:
             node = queue.pop(0)
-            for child in node.children:
-                if isinstance(child[PTR_INDEX], BPlusNode):
-                    queue.append(child[PTR_INDEX])
-                elif child[RID_INDEX] != float('inf'):
-                    result.append(child[RID_INDEX])
+            if node.is_leaf:
+                result.extend(node.keys)
+            else:
+                queue.extend(node.ptrs)
         return result
 
     def __repr__(self) -> str:
@@ -339,16 +1253,14 @@ class BPlusTree():
         string = "-~ BPlusTree ~-\n"
         string += "\t" * level + f"Level {level}: "
         string += repr(self.root)
-        queue = [(c[PTR_INDEX], level + 1) for c in self.root.children]
+        queue = [] if self.root.is_leaf else [(c, 1) for c in self.root.ptrs]
         while queue:
             node, l = queue.pop(0)
-            if not isinstance(node, BPlusNode):
-                continue
-            for c in node.children:
-                queue.append((c[PTR_INDEX], l + 1))
+            if not node.is_leaf:
+                queue.extend((c, l + 1) for c in node.ptrs)
             if l > level:
                 level = l
                 string += "\n" + f"Level {level}: {node}"
             else:
                 string += ", " + repr(node)
-        return string
\ No newline at end of file
+        return string
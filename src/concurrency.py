@@ -0,0 +1,444 @@
+import threading
+from bisect import bisect_left, bisect_right
+from itertools import islice
+
+from .bplus import BPlusNode, BPlusTree
+
+SCAN_BATCH = 256                          # Pairs copied per latched scan pass.
+
+
+class RWLatch():
+    """ A readers-writer latch that prefers waiting writers. """
+
+    def __init__(self) -> None:
+        self.cond = threading.Condition(threading.Lock())
+        self.readers = 0
+        self.writer = False
+        self.waiting = 0                                   # Writers queued up.
+        self.blocked = 0                              # Threads asleep on cond.
+
+    def wait(self):
+        self.blocked += 1
+        self.cond.wait()
+        self.blocked -= 1
+
+    def acquire_read(self):
+        with self.cond:
+            while self.writer or self.waiting:
+                self.wait()
+            self.readers += 1
+
+    def try_read(self):
+        """ Take a read latch only if that needs no waiting. """
+        with self.cond:
+            if self.writer or self.waiting:
+                return False
+            self.readers += 1
+            return True
+
+    def release_read(self):
+        with self.cond:
+            self.readers -= 1
+            if not self.readers and self.blocked:
+                self.cond.notify_all()
+
+    def acquire_write(self):
+        with self.cond:
+            self.waiting += 1
+            while self.writer or self.readers:
+                self.wait()
+            self.waiting -= 1
+            self.writer = True
+
+    def release_write(self):
+        with self.cond:
+            self.writer = False
+            if self.blocked:
+                self.cond.notify_all()
+
+
+class LatchedNode(BPlusNode):
+    __slots__ = ('latch',)
+
+    def __init__(self, is_leaf=True) -> None:
+        super().__init__(is_leaf)
+        self.latch = RWLatch()
+
+
+class ConcurrentBPlusTree(BPlusTree):
+    """ A BPlusTree that many threads may read and write at once.
+
+    Every node carries a readers-writer latch. Readers crab down with shared
+    latches, holding at most a parent and a child at a time. Writers first
+    try an optimistic descent (shared latches, exclusive only on the leaf);
+    if the leaf might split or underflow they restart with exclusive latch
+    coupling, releasing every ancestor as soon as a node is known to be
+    safe. Sibling latches are taken under the latched parent before a
+    merge. A separate root latch guards the root pointer itself.
+
+    Range scans copy up to SCAN_BATCH pairs per pass, stepping along leaf
+    links only when the neighbour's latch is free (a blocking wait there
+    could deadlock against a merge) and otherwise re-descending from the
+    root. No latch is held while the caller consumes results. Only the
+    operations defined here are thread-safe; the batch APIs fall back to
+    one operation per rid.
+    """
+    node_class = LatchedNode
+
+    def __init__(self, deg) -> None:
+        super().__init__(deg)
+        self.root_latch = RWLatch()
+        self.local = threading.local()            # Latches held by the thread.
+        self.size_lock = threading.Lock()
+
+    # ----------------------------------------------------------------------- #
+    #                              LATCH COUPLING                             #
+    # ----------------------------------------------------------------------- #
+
+    def hold(self, latch):
+        latch.acquire_write()
+        self.local.held.append(latch)
+
+    def release_ancestors(self):
+        held = self.local.held
+        for latch in held[:-1]:                   # Keep only the newest latch.
+            latch.release_write()
+        del held[:-1]
+
+    def release_all(self):
+        for latch in reversed(self.local.held):
+            latch.release_write()
+        self.local.held = []
+
+    def descend_read(self, pick):
+        """ Return a read-latched leaf and its (lo, hi) fences.
+
+        `pick(keys)` chooses which child to follow at each internal node.
+        """
+        self.root_latch.acquire_read()
+        node = self.root
+        if node is None:
+            self.root_latch.release_read()
+            return None, None, None
+        node.latch.acquire_read()
+        self.root_latch.release_read()
+        lo = hi = None
+        while not node.is_leaf:
+            i = pick(node.keys)
+            if i:
+                lo = node.keys[i - 1]
+            if i < len(node.keys):
+                hi = node.keys[i]
+            child = node.ptrs[i]
+            child.latch.acquire_read()
+            node.latch.release_read()
+            node = child
+        return node, lo, hi
+
+    def descend_optimistic(self, rid):
+        """ Read-latch down to the leaf for rid and write-latch the leaf. """
+        self.root_latch.acquire_read()
+        node = self.root
+        if node is None:
+            self.root_latch.release_read()
+            return None
+        if node.is_leaf:
+            node.latch.acquire_write()
+            self.root_latch.release_read()
+            return node
+        node.latch.acquire_read()
+        self.root_latch.release_read()
+        while True:
+            child = node.ptrs[bisect_right(node.keys, rid)]
+            if child.is_leaf:
+                child.latch.acquire_write()
+            else:
+                child.latch.acquire_read()
+            node.latch.release_read()
+            node = child
+            if node.is_leaf:
+                return node
+
+    def descend_write(self, rid, safe):
+        """ Write-latch down to the leaf, keeping only unsafe ancestors. """
+        self.local.held = []
+        self.hold(self.root_latch)
+        node = self.root
+        if node is None:
+            return None
+        self.hold(node.latch)
+        if safe(node):
+            self.release_ancestors()
+        while not node.is_leaf:
+            node = node.ptrs[bisect_right(node.keys, rid)]
+            self.hold(node.latch)
+            if safe(node):
+                self.release_ancestors()
+        return node
+
+    def count(self, delta):
+        with self.size_lock:
+            self.size += delta
+
+    def safe_insert(self, node):
+        return len(node.keys) < self.deg - 1                  # Will not split.
+
+    def safe_delete(self, node):
+        if node is self.root:                           # Root must keep a rid.
+            return len(node.keys) > 1
+        return len(node.keys) > self.min_node_size        # Will not underflow.
+
+    # ----------------------------------------------------------------------- #
+    #                                OPERATIONS                               #
+    # ----------------------------------------------------------------------- #
+
+    def insert(self, rid, data=True):
+        leaf = self.descend_optimistic(rid)
+        if leaf is not None:
+            try:
+                i = bisect_left(leaf.keys, rid)
+                if i < len(leaf.keys) and leaf.keys[i] == rid:
+                    return False
+                if self.safe_insert(leaf):
+                    leaf.keys.insert(i, rid)             # Fast path, no split.
+                    leaf.ptrs.insert(i, data)
+                    self.count(1)
+                    return True
+            finally:
+                leaf.latch.release_write()
+        try:                                           # Retry pessimistically.
+            leaf = self.descend_write(rid, self.safe_insert)
+            if leaf is None:
+                leaf = self.root = self.node_class()
+            i = bisect_left(leaf.keys, rid)
+            if i < len(leaf.keys) and leaf.keys[i] == rid:
+                return False
+            leaf.keys.insert(i, rid)
+            leaf.ptrs.insert(i, data)
+            self.count(1)
+            if len(leaf.keys) == self.deg:
+                self.split(leaf)
+            return True
+        finally:
+            self.release_all()
+
+    def delete(self, rid):
+        leaf = self.descend_optimistic(rid)
+        if leaf is None:
+            return False
+        try:
+            i = bisect_left(leaf.keys, rid)
+            if i == len(leaf.keys) or leaf.keys[i] != rid:
+                return False
+            if self.safe_delete(leaf):                   # Fast path, no merge.
+                leaf.pop(i)
+                self.count(-1)
+                return True
+        finally:
+            leaf.latch.release_write()
+        try:                                           # Retry pessimistically.
+            leaf = self.descend_write(rid, self.safe_delete)
+            if leaf is None:
+                return False
+            i = bisect_left(leaf.keys, rid)
+            if i == len(leaf.keys) or leaf.keys[i] != rid:
+                return False
+            leaf.pop(i)
+            self.count(-1)
+            self.merge_leaf(leaf)
+            return True
+        finally:
+            self.release_all()
+
+    def latch_siblings(self, node):
+        """ Write-latch and return the siblings a merge of node may touch. """
+        if node is self.root or len(node.keys) >= self.min_node_size:
+            return None, None                      # No merge will happen here.
+        siblings = node.get_siblings()
+        for sibling in siblings:
+            if sibling is not None:
+                self.hold(sibling.latch)
+        return siblings
+
+    def merge_leaf(self, node):
+        ls, rs = self.latch_siblings(node)
+        result = super().merge_leaf(node)
+        if ls is not None and ls.next is not node:
+            node.prev = node.next = None         # Merged into ls: unlink it so
+        elif rs is not None and node.next is not rs:   # a scan holding a stale
+            rs.prev = rs.next = None                # link re-descends instead.
+        return result
+
+    def merge_internal(self, node):
+        self.latch_siblings(node)
+        return super().merge_internal(node)
+
+    def insert_many(self, pairs):
+        return [self.insert(rid, data) for rid, data in pairs]
+
+    def delete_many(self, rids):
+        return [self.delete(rid) for rid in rids]
+
+    def search(self, rid):
+        return self.lookup(rid, None)
+
+    def lookup(self, rid, default):
+        """ Return rid's data, or default only if rid is not in the tree. """
+        leaf, _, _ = self.descend_read(lambda keys: bisect_right(keys, rid))
+        if leaf is None:
+            return default
+        try:
+            i = bisect_left(leaf.keys, rid)
+            if i < len(leaf.keys) and leaf.keys[i] == rid:
+                return leaf.ptrs[i]
+            return default
+        finally:
+            leaf.latch.release_read()
+
+    def search_many(self, rids, default=None):
+        if hasattr(rids, "tolist"):
+            rids = rids.tolist()
+        return [self.lookup(rid, default) for rid in rids]
+
+    def __contains__(self, rid):
+        leaf, _, _ = self.descend_read(lambda keys: bisect_right(keys, rid))
+        if leaf is None:
+            return False
+        try:
+            i = bisect_left(leaf.keys, rid)
+            return i < len(leaf.keys) and leaf.keys[i] == rid
+        finally:
+            leaf.latch.release_read()
+
+    def items(self, lo=None, hi=None, reverse=False, inclusive=(True, True),
+              limit=None, offset=0):
+        scan = self.scan_desc if reverse else self.scan_asc
+        pairs = scan(lo, hi, inclusive)
+        if offset or limit is not None:
+            stop = None if limit is None else offset + limit
+            pairs = islice(pairs, offset, stop)
+        return pairs
+
+    def scan_asc(self, lo, hi, inclusive):
+        bound, closed = lo, inclusive[0]
+        stop = bisect_right if inclusive[1] else bisect_left
+        while True:
+            if bound is None:
+                leaf, _, fence = self.descend_read(lambda keys: 0)
+            else:
+                leaf, _, fence = self.descend_read(
+                    lambda keys: bisect_right(keys, bound))
+            if leaf is None:
+                return
+            keys = leaf.keys
+            if bound is None:
+                i = 0
+            else:
+                i = (bisect_left if closed else bisect_right)(keys, bound)
+            chunk = []
+            while True:                         # Copy leaves while none block.
+                j = len(keys) if hi is None else stop(keys, hi)
+                chunk.extend(zip(keys[i:j], leaf.ptrs[i:j]))
+                done = j < len(keys) or leaf.next is None
+                if done or len(chunk) >= SCAN_BATCH:
+                    break
+                nxt = leaf.next
+                if not nxt.latch.try_read():
+                    break
+                leaf.latch.release_read()
+                leaf, keys, i, fence = nxt, nxt.keys, 0, None
+            leaf.latch.release_read()
+            yield from chunk
+            if done:
+                return
+            if fence is None:                           # Resume after the last
+                bound, closed = chunk[-1][0], False            # rid we copied.
+            else:
+                bound, closed = fence, True    # Next leaf starts at the fence.
+            if hi is not None and bound > hi:
+                return
+
+    def scan_desc(self, lo, hi, inclusive):
+        bound, closed = hi, inclusive[1]
+        stop = bisect_left if inclusive[0] else bisect_right
+        while True:
+            if bound is None:
+                leaf, fence, _ = self.descend_read(len)
+            else:
+                pick = bisect_right if closed else bisect_left
+                leaf, fence, _ = self.descend_read(
+                    lambda keys: pick(keys, bound))
+            if leaf is None:
+                return
+            keys = leaf.keys
+            if bound is None:
+                j = len(keys)
+            else:
+                j = (bisect_right if closed else bisect_left)(keys, bound)
+            chunk = []
+            while True:                         # Copy leaves while none block.
+                i = 0 if lo is None else stop(keys, lo)
+                chunk.extend(reversed(list(zip(keys[i:j], leaf.ptrs[i:j]))))
+                done = i > 0 or leaf.prev is None
+                if done or len(chunk) >= SCAN_BATCH:
+                    break
+                prv = leaf.prev
+                if not prv.latch.try_read():
+                    break
+                if prv.next is not leaf:      # prev was read before a split or
+                    prv.latch.release_read()        # merge relinked the chain.
+                    break
+                leaf.latch.release_read()
+                leaf, keys, fence = prv, prv.keys, None
+                j = len(keys)
+            leaf.latch.release_read()
+            yield from chunk
+            if done:
+                return
+            if fence is None:                          # Resume before the last
+                bound, closed = chunk[-1][0], False            # rid we copied.
+            else:
+                bound, closed = fence, False     # Next leaf ends before fence.
+            if lo is not None and bound < lo:
+                return
+
+    def range(self, rid_1, rid_2):
+        return [rid for rid, _ in self.scan_asc(rid_1, rid_2, (True, True))]
+
+    def inorder(self):
+        return [rid for rid, _ in self.scan_asc(None, None, (True, True))]
+
+    def iter_inorder(self):
+        return (rid for rid, _ in self.scan_asc(None, None, (True, True)))
+
+    def before(self, rid, seek):
+        leaf, _, _ = self.descend_read(lambda keys: bisect_right(keys, rid))
+        if leaf is None:
+            return None
+        try:
+            i = seek(leaf.keys, rid)
+            if i:
+                return leaf.keys[i - 1]
+        finally:
+            leaf.latch.release_read()
+        pairs = self.scan_desc(None, rid, (True, seek is bisect_right))
+        return next(pairs, (None,))[0]            # The answer is further left.
+
+    def after(self, rid, seek):
+        leaf, _, _ = self.descend_read(lambda keys: bisect_right(keys, rid))
+        if leaf is None:
+            return None
+        try:
+            i = seek(leaf.keys, rid)
+            if i < len(leaf.keys):
+                return leaf.keys[i]
+        finally:
+            leaf.latch.release_read()
+        pairs = self.scan_asc(rid, None, (seek is bisect_left, True))
+        return next(pairs, (None,))[0]           # The answer is further right.
+
+    def min(self):
+        return next(self.scan_asc(None, None, (True, True)), (None,))[0]
+
+    def max(self):
+        return next(self.scan_desc(None, None, (True, True)), (None,))[0]
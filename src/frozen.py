@@ -0,0 +1,161 @@
+import mmap
+import os
+import pickle
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import islice
+
+MAGIC = b"BPFROZ02"
+HEADER = struct.Struct("<8sIxxxxq")         # magic, fanout, pad, record count.
+
+
+class FrozenBPlusTree():
+    """ An immutable B+ tree laid out as flat, sorted arrays.
+
+    `keys` holds every rid in order in one contiguous array and `directory`
+    holds every `fanout`-th rid of it (a one-level CSS-tree index). A lookup
+    bisects the directory and then a single block of `fanout` rids, which
+    is two C-level bisections and no pointer chasing.
+
+    save() writes the rids, value offsets and pickled values to a binary
+    file that open() maps with mmap and reads in place: only the directory
+    is rebuilt, and a value is unpickled only when it is asked for. Many
+    processes can share one copy of the file through the page cache.
+    """
+
+    def __init__(self, keys, fanout, values=None, offsets=None,
+                 blobs=None) -> None:
+        self.keys = keys
+        self.fanout = fanout
+        self.directory = list(keys[::fanout])
+        self.values = values                         # In-memory values, or ...
+        self.offsets = offsets                # ... offsets into pickled blobs.
+        self.blobs = blobs
+        self.mm = None                           # Set when opened from a file.
+        self.view = None
+
+    @classmethod
+    def from_items(cls, items, fanout=64):
+        if fanout < 2:
+            raise ValueError("fanout must be at least 2")
+        keys, values = [], []
+        for rid, data in items:
+            keys.append(rid)
+            values.append(data)
+        return cls(keys, fanout, values=values)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ----------------------------------------------------------------------- #
+    #                                 QUERIES                                 #
+    # ----------------------------------------------------------------------- #
+
+    def locate(self, rid):
+        """ Return the index of the first rid >= `rid` in keys. """
+        lo = bisect_right(self.directory, rid) - 1
+        lo = lo * self.fanout if lo > 0 else 0
+        hi = min(lo + self.fanout, len(self.keys))
+        return bisect_left(self.keys, rid, lo, hi)
+
+    def value(self, i):
+        if self.values is not None:
+            return self.values[i]
+        return pickle.loads(self.blobs[self.offsets[i]:self.offsets[i + 1]])
+
+    def search(self, rid):
+        i = self.locate(rid)
+        if i < len(self.keys) and self.keys[i] == rid:
+            return self.value(i)
+        return None
+
+    def __contains__(self, rid):
+        i = self.locate(rid)
+        return i < len(self.keys) and self.keys[i] == rid
+
+    def bounds(self, rid_1, rid_2):
+        i = 0 if rid_1 is None else self.locate(rid_1)
+        if rid_2 is None:
+            return i, len(self.keys)
+        j = self.locate(rid_2)
+        if j < len(self.keys) and self.keys[j] == rid_2:
+            j += 1
+        return i, max(i, j)
+
+    def range(self, rid_1, rid_2):
+        i, j = self.bounds(rid_1, rid_2)
+        return list(self.keys[i:j])
+
+    def items(self, lo=None, hi=None, limit=None, offset=0):
+        """ Lazily yield (rid, data) pairs with lo <= rid <= hi. """
+        i, j = self.bounds(lo, hi)
+        pairs = ((self.keys[k], self.value(k)) for k in range(i, j))
+        if offset or limit is not None:
+            stop = None if limit is None else offset + limit
+            pairs = islice(pairs, offset, stop)
+        return pairs
+
+    def inorder(self):
+        return list(self.keys)
+
+    # ----------------------------------------------------------------------- #
+    #                              SAVE AND OPEN                              #
+    # ----------------------------------------------------------------------- #
+
+    def save(self, path):
+        """ Write the tree to `path` in the format open() maps. """
+        try:
+            keys = array("q", self.keys)
+        except (TypeError, OverflowError):
+            raise TypeError("Only trees with int64 rids can be saved")
+        blobs = [pickle.dumps(self.value(i), pickle.HIGHEST_PROTOCOL)
+                 for i in range(len(self.keys))]
+        offsets = array("q", [0])
+        for blob in blobs:
+            offsets.append(offsets[-1] + len(blob))
+        with open(path + ".tmp", "wb") as fp:
+            fp.write(HEADER.pack(MAGIC, self.fanout, len(keys)))
+            fp.write(keys.tobytes())                   # 8-byte aligned arrays,
+            fp.write(offsets.tobytes())                   # then the raw blobs.
+            fp.write(b"".join(blobs))
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def open(cls, path):
+        """ Map a saved tree into memory without deserializing it. """
+        with open(path, "rb") as fp:
+            mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mm)
+        magic, fanout, count = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            view.release()
+            mm.close()
+            raise ValueError(f"{path} is not a frozen B+ tree file")
+        offset = HEADER.size
+        keys = view[offset:offset + 8 * count].cast("q")
+        offset += 8 * count
+        offsets = view[offset:offset + 8 * (count + 1)].cast("q")
+        offset += 8 * (count + 1)
+        tree = cls(keys, fanout, offsets=offsets, blobs=view[offset:])
+        tree.mm = mm
+        tree.view = view
+        return tree
+
+    def close(self):
+        if self.mm is None:
+            return
+        self.keys.release()                     # Views must go before the map.
+        self.offsets.release()
+        self.blobs.release()
+        self.view.release()
+        self.mm.close()
+        self.mm = None
@@ -0,0 +1,290 @@
+from functools import wraps
+from time import perf_counter_ns
+
+OPERATIONS = ("insert", "delete", "search", "insert_many", "delete_many",
+              "search_many", "range", "items", "delete_range",
+              "compact")                          # Timed if the tree has them.
+DESCENTS = ("find_leaf", "find_nodes")                    # Root-to-leaf walks.
+LAZY = ("items",)            # Return iterators, timed until drained or closed.
+COUNTERS = ("descents", "nodes_visited", "comparisons", "finger_hits")
+EVENTS = ("split", "split_many", "rotate", "rebalance")        # Calls counted.
+
+
+def depth(node):
+    """ Return how many nodes lie on the path from the root to node. """
+    n = 1
+    while node.parent is not None:
+        node = node.parent
+        n += 1
+    return n
+
+
+def path_cost(node):
+    """ Return the nodes on node's path and their bisect comparisons. """
+    nodes = compares = 0
+    while node is not None:
+        nodes += 1
+        compares += len(node.keys).bit_length()            # ceil(log2(n + 1)).
+        node = node.parent
+    return nodes, compares
+
+
+def merge_case(tree, node):
+    """ Name the case merge_leaf/merge_internal will take for node. """
+    if node is tree.root:
+        return "root"
+    if len(node.keys) >= tree.min_node_size:
+        return "none"
+    ls, rs = node.get_siblings()
+    if ls and len(ls.keys) > tree.min_node_size:
+        return "steal_left"
+    if rs and len(rs.keys) > tree.min_node_size:
+        return "steal_right"
+    return "merge_left" if ls else "merge_right"
+
+
+class Instrumentation():
+    """ Opt-in counters and latency histograms for one BPlusTree.
+
+    Attaching wraps the tree's methods on the instance, so a tree that is
+    not instrumented runs its plain class methods and pays nothing; detach()
+    removes the wrappers again. While attached it counts:
+
+    - descents and the nodes they visit (seek, find_leaf, find_nodes and
+      find_fence), with finger hits counted as a one-node visit;
+    - key comparisons, estimated as ceil(log2(n + 1)) per bisect of an
+      n-key node, plus the two fence checks of a finger hit;
+    - split, split_many, rotate and rebalance calls, and every
+      merge_leaf/merge_internal call by the case it takes;
+    - the latency of each public operation, in power-of-two nanosecond
+      buckets. Nested operations are timed only as part of the outer one.
+      A lazy scan (items) is timed from the call until it is exhausted or
+      closed, so it includes whatever the caller does between pairs.
+
+    `hook(op, elapsed_ns)`, if given, is called after every timed operation,
+    e.g. to feed an external metrics system.
+    """
+
+    def __init__(self, tree, hook=None) -> None:
+        self.tree = tree
+        self.hook = hook
+        self.wrapped = []
+        self.active = 0                           # Depth of nested operations.
+        self.counters = {}
+        self.events = {}
+        self.merges = {"merge_leaf": {}, "merge_internal": {}}
+        self.latency = {}                              # op -> {bucket: count}.
+        self.reset()
+        self.attach()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.detach()
+
+    def reset(self):
+        """ Zero every counter in place, where the wrappers write. """
+        self.counters.update(dict.fromkeys(COUNTERS, 0))
+        self.events.clear()
+        for cases in self.merges.values():
+            cases.clear()
+        for buckets in self.latency.values():
+            buckets.clear()
+
+    # ----------------------------------------------------------------------- #
+    #                                WRAPPING                                 #
+    # ----------------------------------------------------------------------- #
+
+    def attach(self):
+        for name in OPERATIONS:
+            self.wrap(name, self.timed)
+        for name in DESCENTS:
+            self.wrap(name, self.descent)
+        for name in EVENTS:
+            self.wrap(name, self.event)
+        for name in ("merge_leaf", "merge_internal"):
+            self.wrap(name, self.merge)
+        self.wrap("seek", self.seek)
+        self.wrap("find_fence", self.fence)
+
+    def wrap(self, name, make):
+        method = getattr(self.tree, name, None)
+        if method is None or name in vars(self.tree):
+            return                       # Missing, or wrapped by someone else.
+        setattr(self.tree, name, wraps(method)(make(name, method)))
+        self.wrapped.append(name)
+
+    def detach(self):
+        for name in self.wrapped:
+            delattr(self.tree, name)
+        self.wrapped = []
+
+    def timed(self, name, method):
+        self.latency.setdefault(name, {})
+        if name in LAZY:
+            return self.lazy(name, method)
+
+        def timed(*args, **kwargs):
+            if self.active:
+                return method(*args, **kwargs)
+            self.active += 1
+            start = perf_counter_ns()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = perf_counter_ns() - start
+                self.active -= 1
+                self.record(name, elapsed)
+        return timed
+
+    def lazy(self, name, method):
+        def lazy(*args, **kwargs):
+            if self.active:
+                return method(*args, **kwargs)
+            return self.drain(name, perf_counter_ns(), method(*args, **kwargs))
+        return lazy
+
+    def drain(self, name, start, pairs):
+        try:
+            yield from pairs
+        finally:
+            self.record(name, perf_counter_ns() - start)
+
+    def record(self, name, elapsed):
+        latency = self.latency[name]
+        bucket = elapsed.bit_length()
+        latency[bucket] = latency.get(bucket, 0) + 1
+        if self.hook is not None:
+            self.hook(name, elapsed)
+
+    def visit(self, leaf):
+        nodes, compares = path_cost(leaf)
+        counters = self.counters
+        counters["descents"] += 1
+        counters["nodes_visited"] += nodes
+        counters["comparisons"] += compares
+
+    def descent(self, name, method):
+        def descent(rid):
+            result = method(rid)
+            leaf = result[0] if isinstance(result, tuple) else result
+            if leaf is not None:
+                self.visit(leaf)
+            return result
+        return descent
+
+    def seek(self, name, method):
+        tree = self.tree
+        counters = self.counters
+
+        def seek(rid):
+            hits = tree.finger_hits
+            leaf = method(rid)
+            if tree.finger_hits != hits:
+                counters["finger_hits"] += 1
+                counters["nodes_visited"] += 1
+                counters["comparisons"] += 2 + len(leaf.keys).bit_length()
+            else:
+                self.visit(leaf)
+            return leaf
+        return seek
+
+    def fence(self, name, method):
+        counters = self.counters
+
+        def fence(rid, start=None):
+            leaf, hi = method(rid, start)
+            if start is None or start.parent is None:
+                self.visit(leaf)
+                return leaf, hi
+            a, b = start, leaf             # Leaves share a depth: climb to the
+            nodes = 1                           # common ancestor side by side.
+            compares = len(leaf.keys).bit_length()
+            while a is not b:
+                a, b = a.parent, b.parent
+                nodes += 2
+                compares += 1 + len(b.keys).bit_length()       # Climb, bisect.
+            counters["descents"] += 1
+            counters["nodes_visited"] += nodes - 1
+            counters["comparisons"] += compares
+            return leaf, hi
+        return fence
+
+    def event(self, name, method):
+        events = self.events
+
+        def event(*args, **kwargs):
+            events[name] = events.get(name, 0) + 1
+            return method(*args, **kwargs)
+        return event
+
+    def merge(self, name, method):
+        cases = self.merges[name]
+
+        def merge(node):
+            case = merge_case(self.tree, node)
+            cases[case] = cases.get(case, 0) + 1
+            return method(node)
+        return merge
+
+    # ----------------------------------------------------------------------- #
+    #                                 EXPORT                                  #
+    # ----------------------------------------------------------------------- #
+
+    def shape(self):
+        """ Return the tree's height and leaf fill, walking its leaves. """
+        tree = self.tree
+        if tree.root is None:
+            return 0, 0
+        node = tree.root
+        while not node.is_leaf:
+            node = node.ptrs[0]
+        height = depth(node)
+        leaves = keys = 0
+        while node is not None:
+            leaves += 1
+            keys += len(node.keys)
+            node = node.next
+        return height, keys / (leaves * (tree.deg - 1))
+
+    def histograms(self):
+        """ Summarize each operation's latency buckets.
+
+        Bucket b counts the calls that took 2**(b-1) to 2**b - 1 ns, so the
+        percentiles are upper bounds within a factor of two.
+        """
+        result = {}
+        for op, buckets in self.latency.items():
+            count = sum(buckets.values())
+            if not count:
+                continue
+            summary = {"count": count, "buckets": {
+                2 ** b: buckets[b] for b in sorted(buckets)}}
+            for q in (0.5, 0.9, 0.99):
+                seen = 0
+                for b in sorted(buckets):
+                    seen += buckets[b]
+                    if seen >= q * count:
+                        summary[f"p{round(q * 100)}_ns"] = 2 ** b
+                        break
+            summary["max_ns"] = 2 ** max(buckets)
+            result[op] = summary
+        return result
+
+    def stats(self):
+        """ Return every counter and histogram as a plain dict. """
+        height, fill = self.shape()
+        counters = self.counters
+        descents = counters["descents"]
+        return {
+            **counters,
+            "nodes_per_descent": (counters["nodes_visited"] - counters[
+                "finger_hits"]) / descents if descents else 0,
+            "height": height,
+            "leaf_fill": fill,
+            "events": dict(self.events),
+            "merges": {name: dict(cases)
+                       for name, cases in self.merges.items()},
+            "latency": self.histograms(),
+        }
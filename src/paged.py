@@ -0,0 +1,509 @@
+import os
+import pickle
+import struct
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import islice
+
+NULL_PAGE = 0                             # Page 0 is the header, never a node.
+MAGIC = b"BPTREE01"
+HEADER = struct.Struct("<8sIIqqqq")        # magic, page size, deg, root, free,
+                                                # page count, record count.
+LEAF_HEADER = struct.Struct("<BHqq")                  # is_leaf, n, next, prev.
+INODE_HEADER = struct.Struct("<BH")                               # is_leaf, n.
+FREE_PAGE = struct.Struct("<q")                   # Next page on the free list.
+KEY_MIN, KEY_MAX = -2**63, 2**63 - 1
+DATA_MAX = 2**16 - 1                          # Data lengths are stored as "H".
+SLOT = 10                                   # Leaf bytes per record: rid, size.
+
+
+class PagedNode():
+    """ The in-memory image of one page.
+
+    Leaves keep their data in ptrs and count the page bytes their records
+    take in used; internal nodes keep child page ids in ptrs. Nodes have no
+    parent pointers, descents record their path.
+    """
+    __slots__ = ('pid', 'is_leaf', 'keys', 'ptrs', 'next', 'prev', 'used')
+
+    def __init__(self, pid, is_leaf=True) -> None:
+        self.pid = pid
+        self.is_leaf = is_leaf
+        self.keys = []
+        self.ptrs = []
+        self.next = NULL_PAGE
+        self.prev = NULL_PAGE
+        self.used = 0
+
+    def __repr__(self) -> str:
+        return f"PagedNode(pid={self.pid}, keys={self.keys})"
+
+
+class Pager():
+    """ Reads and writes fixed-size pages of a single file with pread. """
+
+    def __init__(self, path, page_size) -> None:
+        flags = os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0)
+        self.fd = os.open(path, flags, 0o644)
+        self.page_size = page_size
+        self.reads = 0
+        self.writes = 0
+
+    def read(self, pid):
+        self.reads += 1
+        data = os.pread(self.fd, self.page_size, pid * self.page_size)
+        return data.ljust(self.page_size, b"\0")
+
+    def write(self, pid, data):
+        if len(data) > self.page_size:
+            raise ValueError(f"Page {pid} overflows {self.page_size} bytes")
+        self.writes += 1
+        data = data.ljust(self.page_size, b"\0")
+        os.pwrite(self.fd, data, pid * self.page_size)
+
+    def read_node(self, pid):
+        data = self.read(pid)
+        if data[0]:
+            _, n, nxt, prv = LEAF_HEADER.unpack_from(data)
+            node = PagedNode(pid, is_leaf=True)
+            node.next, node.prev = nxt, prv
+            offset = LEAF_HEADER.size
+            node.keys = list(struct.unpack_from(f"<{n}q", data, offset))
+            offset += 8 * n
+            sizes = struct.unpack_from(f"<{n}H", data, offset)
+            offset += 2 * n
+            node.used = SLOT * n + sum(sizes)
+            for size in sizes:
+                node.ptrs.append(pickle.loads(data[offset:offset + size]))
+                offset += size
+        else:
+            _, n = INODE_HEADER.unpack_from(data)
+            node = PagedNode(pid, is_leaf=False)
+            offset = INODE_HEADER.size
+            node.keys = list(struct.unpack_from(f"<{n}q", data, offset))
+            offset += 8 * n
+            node.ptrs = list(struct.unpack_from(f"<{n + 1}q", data, offset))
+        return node
+
+    def write_node(self, node):
+        n = len(node.keys)
+        if node.is_leaf:
+            blobs = [pickle.dumps(p) for p in node.ptrs]
+            parts = [LEAF_HEADER.pack(1, n, node.next, node.prev),
+                     struct.pack(f"<{n}q", *node.keys),
+                     struct.pack(f"<{n}H", *map(len, blobs))]
+            parts.extend(blobs)
+        else:
+            parts = [INODE_HEADER.pack(0, n),
+                     struct.pack(f"<{n}q", *node.keys),
+                     struct.pack(f"<{n + 1}q", *node.ptrs)]
+        self.write(node.pid, b"".join(parts))
+
+    def sync(self):
+        os.fsync(self.fd)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class BufferPool():
+    """ A bounded LRU cache of decoded pages with dirty-page write-back.
+
+    Pages touched by the operation in progress are pinned and are never
+    evicted under it, so the pool may briefly hold a few pages more than
+    its capacity; unpin_all() at the end of an operation evicts back down.
+    """
+
+    def __init__(self, pager, capacity) -> None:
+        self.pager = pager
+        self.capacity = max(1, capacity)
+        self.frames = OrderedDict()
+        self.dirty = set()
+        self.pinned = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, pid, pin=True):
+        if pin:
+            self.pinned.add(pid)
+        node = self.frames.get(pid)
+        if node is not None:
+            self.hits += 1
+            self.frames.move_to_end(pid)
+        else:
+            self.misses += 1
+            node = self.pager.read_node(pid)
+            self.frames[pid] = node
+            self.evict()
+        return node
+
+    def put(self, node):
+        self.frames[node.pid] = node                        # A brand new page.
+        self.dirty.add(node.pid)
+        self.pinned.add(node.pid)
+        self.evict()
+
+    def mark_dirty(self, node):
+        self.dirty.add(node.pid)
+
+    def discard(self, pid):
+        self.frames.pop(pid, None)
+        self.dirty.discard(pid)
+        self.pinned.discard(pid)
+
+    def evict(self):
+        budget = len(self.frames)             # Pinned frames are skipped once.
+        while len(self.frames) > self.capacity and budget:
+            budget -= 1
+            pid, node = next(iter(self.frames.items()))
+            if pid in self.pinned:
+                self.frames.move_to_end(pid)
+                continue
+            del self.frames[pid]
+            self.evictions += 1
+            if pid in self.dirty:                        # Write back on evict.
+                self.dirty.remove(pid)
+                self.pager.write_node(node)
+
+    def unpin_all(self):
+        self.pinned.clear()
+        self.evict()
+
+    def flush(self):
+        for pid in sorted(self.dirty):
+            self.pager.write_node(self.frames[pid])
+        self.dirty.clear()
+
+
+class PagedBPlusTree():
+    """ A B+ tree whose nodes live in fixed-size pages of a single file.
+
+    Keys are 64-bit signed integers; data may be any picklable object
+    whose pickle fits in half a leaf page (`max_data_size`: 2028 bytes with
+    the default 4 KiB pages, at most 65535). A leaf splits when it reaches
+    `deg` rids or when its records no longer fit in its page, whichever
+    comes first. Pages are read through a BufferPool of `pool_size` pages,
+    and dirty pages are written back on eviction and on flush()/close().
+    Opening an existing file reuses its degree and page size.
+    """
+
+    def __init__(self, path, deg=64, page_size=4096, pool_size=256) -> None:
+        self.path = path
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            with open(path, "rb") as fp:
+                header = fp.read(HEADER.size)
+            magic, page_size, deg, *_ = HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a paged B+ tree file")
+        self.deg = deg
+        self.min_node_size = -(-deg // 2) - 1
+        self.page_size = page_size
+        inode_bytes = INODE_HEADER.size + 8 * (deg - 1) + 8 * deg
+        self.leaf_room = page_size - LEAF_HEADER.size
+        self.max_data_size = min(self.leaf_room // 2 - SLOT, DATA_MAX)
+        if deg < 3 or inode_bytes > page_size or self.max_data_size < 8:
+            raise ValueError(f"deg {deg} does not fit in {page_size}B pages")
+        self.pager = Pager(path, page_size)
+        self.pool = BufferPool(self.pager, pool_size)
+        if exists:
+            header = self.pager.read(NULL_PAGE)
+            _, _, _, self.root, self.free, self.pages, self.size = \
+                HEADER.unpack_from(header)
+        else:
+            self.root = NULL_PAGE
+            self.free = NULL_PAGE
+            self.pages = 1
+            self.size = 0
+            self.write_header()
+
+    def __len__(self):
+        return self.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ----------------------------------------------------------------------- #
+    #                              PAGE MANAGEMENT                            #
+    # ----------------------------------------------------------------------- #
+
+    def write_header(self):
+        header = HEADER.pack(MAGIC, self.page_size, self.deg, self.root,
+                             self.free, self.pages, self.size)
+        self.pager.write(NULL_PAGE, header)
+
+    def allocate(self, is_leaf):
+        if self.free:                        # Reuse a page from the free list.
+            pid = self.free
+            self.free = FREE_PAGE.unpack_from(self.pager.read(pid))[0]
+        else:
+            pid = self.pages
+            self.pages += 1
+        node = PagedNode(pid, is_leaf)
+        self.pool.put(node)
+        return node
+
+    def release(self, node):
+        self.pool.discard(node.pid)
+        self.pager.write(node.pid, FREE_PAGE.pack(self.free))
+        self.free = node.pid
+
+    def flush(self):
+        self.pool.flush()
+        self.write_header()
+        self.pager.sync()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.pager.close()                     # Never leak the descriptor.
+
+    def stats(self):
+        return {
+            "hits": self.pool.hits,
+            "misses": self.pool.misses,
+            "evictions": self.pool.evictions,
+            "reads": self.pager.reads,
+            "writes": self.pager.writes,
+            "cached": len(self.pool.frames),
+            "pages": self.pages,
+        }
+
+    # ----------------------------------------------------------------------- #
+    #                                 OPERATIONS                              #
+    # ----------------------------------------------------------------------- #
+
+    def check_rid(self, rid):
+        if not isinstance(rid, int) or not KEY_MIN <= rid <= KEY_MAX:
+            raise TypeError(f"Paged trees need int64 rids, got {rid!r}")
+
+    def descend(self, rid):
+        path = []                                # (internal node, child index)
+        node = self.pool.get(self.root)
+        while not node.is_leaf:
+            i = bisect_right(node.keys, rid)
+            path.append((node, i))
+            node = self.pool.get(node.ptrs[i])
+        return node, path
+
+    def record_size(self, data):
+        return SLOT + len(pickle.dumps(data))
+
+    def insert(self, rid, data=True):
+        self.check_rid(rid)
+        size = self.record_size(data)
+        if size - SLOT > self.max_data_size:
+            raise ValueError(f"Data for {rid} exceeds {self.max_data_size}B")
+        try:
+            if not self.root:
+                self.root = self.allocate(is_leaf=True).pid
+            leaf, path = self.descend(rid)
+            i = bisect_left(leaf.keys, rid)
+            if i < len(leaf.keys) and leaf.keys[i] == rid:     # Already there.
+                return False
+            leaf.keys.insert(i, rid)
+            leaf.ptrs.insert(i, data)
+            leaf.used += size
+            self.pool.mark_dirty(leaf)
+            self.size += 1
+            if len(leaf.keys) == self.deg or leaf.used > self.leaf_room:
+                self.split(leaf, path)
+            return True
+        finally:
+            self.pool.unpin_all()
+
+    def split(self, node, path):
+        rchild = self.allocate(node.is_leaf)
+        mid = len(node.keys) // 2
+        if node.is_leaf:
+            mid, node.used, rchild.used = self.leaf_split(node)
+            rchild.keys, node.keys = node.keys[mid:], node.keys[:mid]
+            rchild.ptrs, node.ptrs = node.ptrs[mid:], node.ptrs[:mid]
+            mrid = rchild.keys[0]
+            rchild.next, rchild.prev = node.next, node.pid
+            if node.next:                           # Link leaf pages together.
+                nxt = self.pool.get(node.next)
+                nxt.prev = rchild.pid
+                self.pool.mark_dirty(nxt)
+            node.next = rchild.pid
+        else:
+            mrid = node.keys[mid]
+            rchild.keys, node.keys = node.keys[mid + 1:], node.keys[:mid]
+            rchild.ptrs, node.ptrs = node.ptrs[mid + 1:], node.ptrs[:mid + 1]
+        self.pool.mark_dirty(node)
+        if not path:                             # Grow the height of the tree.
+            root = self.allocate(is_leaf=False)
+            root.keys = [mrid]
+            root.ptrs = [node.pid, rchild.pid]
+            self.root = root.pid
+            return None
+        parent, i = path.pop()
+        parent.keys.insert(i, mrid)
+        parent.ptrs.insert(i + 1, rchild.pid)
+        self.pool.mark_dirty(parent)
+        if len(parent.keys) == self.deg:
+            self.split(parent, path)                 # Propogate split upwards.
+        return None
+
+    def leaf_split(self, node):
+        """ Return where to split a leaf so that the fuller half holds as
+        few bytes as possible, and the bytes left on either side. As no
+        record takes over half a page, both halves fit in their pages.
+        """
+        sizes = [self.record_size(data) for data in node.ptrs]
+        total = sum(sizes)
+        k, left = 1, sizes[0]
+        while k < len(sizes) - 1 and 2 * (left + sizes[k]) <= total:
+            left += sizes[k]
+            k += 1
+        if k < len(sizes) - 1 and left + sizes[k] < total - left:
+            left += sizes[k]                         # One more evens them out.
+            k += 1
+        return k, left, total - left
+
+    def delete(self, rid):
+        if not self.root:
+            return False
+        try:
+            leaf, path = self.descend(rid)
+            i = bisect_left(leaf.keys, rid)
+            if i == len(leaf.keys) or leaf.keys[i] != rid:
+                return False
+            leaf.used -= self.record_size(leaf.ptrs[i])
+            del leaf.keys[i]
+            del leaf.ptrs[i]
+            self.pool.mark_dirty(leaf)
+            self.size -= 1
+            self.rebalance(leaf, path)
+            return True
+        finally:
+            self.pool.unpin_all()
+
+    def rebalance(self, node, path):
+        if not path:                                   # Node is the root page.
+            if node.is_leaf and not node.keys:
+                self.root = NULL_PAGE
+                self.release(node)
+            elif not node.is_leaf and not node.keys:       # Shrink the height.
+                self.root = node.ptrs[0]
+                self.release(node)
+            return None
+        if len(node.keys) >= self.min_node_size:
+            return None
+        parent, i = path.pop()
+        ls = self.pool.get(parent.ptrs[i - 1]) if i > 0 else None
+        rs = None
+        if i < len(parent.keys):
+            rs = self.pool.get(parent.ptrs[i + 1])
+        if ls and len(ls.keys) > self.min_node_size and \
+                self.fits(node, ls.ptrs[-1]):          # Case I: steal from ls.
+            if node.is_leaf:
+                node.keys.insert(0, ls.keys.pop())
+                node.ptrs.insert(0, ls.ptrs.pop())
+                self.shift(ls, node, node.ptrs[0])
+                parent.keys[i - 1] = node.keys[0]
+            else:
+                node.keys.insert(0, parent.keys[i - 1])
+                node.ptrs.insert(0, ls.ptrs.pop())
+                parent.keys[i - 1] = ls.keys.pop()
+            self.pool.mark_dirty(ls)
+            self.pool.mark_dirty(node)
+        elif rs and len(rs.keys) > self.min_node_size and \
+                self.fits(node, rs.ptrs[0]):               # Case II: steal rs.
+            if node.is_leaf:
+                node.keys.append(rs.keys.pop(0))
+                node.ptrs.append(rs.ptrs.pop(0))
+                self.shift(rs, node, node.ptrs[-1])
+                parent.keys[i] = rs.keys[0]
+            else:
+                node.keys.append(parent.keys[i])
+                node.ptrs.append(rs.ptrs.pop(0))
+                parent.keys[i] = rs.keys.pop(0)
+            self.pool.mark_dirty(rs)
+            self.pool.mark_dirty(node)
+        else:                              # Case III/IV: merge with a sibling.
+            if ls and self.merges(ls, node):
+                left, right, k = ls, node, i - 1
+            elif rs and self.merges(node, rs):
+                left, right, k = node, rs, i
+            else:
+                return None             # Too many bytes to merge: stay sparse.
+            if not left.is_leaf:
+                left.keys.append(parent.keys[k])       # Demote the parent rid.
+            left.keys.extend(right.keys)
+            left.ptrs.extend(right.ptrs)
+            if left.is_leaf:
+                left.used += right.used
+                left.next = right.next
+                if right.next:
+                    nxt = self.pool.get(right.next)
+                    nxt.prev = left.pid
+                    self.pool.mark_dirty(nxt)
+            del parent.keys[k]
+            del parent.ptrs[k + 1]
+            self.pool.mark_dirty(left)
+            self.release(right)
+        self.pool.mark_dirty(parent)
+        return self.rebalance(parent, path)
+
+    def fits(self, node, data):
+        """ Check that a leaf node has page room for one more record. """
+        return not node.is_leaf or \
+            node.used + self.record_size(data) <= self.leaf_room
+
+    def merges(self, left, right):
+        return not left.is_leaf or left.used + right.used <= self.leaf_room
+
+    def shift(self, src, dst, data):
+        size = self.record_size(data)
+        src.used -= size
+        dst.used += size
+
+    def search(self, rid):
+        if not self.root:
+            return None
+        try:
+            leaf, _ = self.descend(rid)
+            i = bisect_left(leaf.keys, rid)
+            if i < len(leaf.keys) and leaf.keys[i] == rid:
+                return leaf.ptrs[i]
+            return None
+        finally:
+            self.pool.unpin_all()
+
+    def items(self, lo=None, hi=None, limit=None, offset=0):
+        """ Lazily yield (rid, data) pairs with lo <= rid <= hi. """
+        pairs = self.scan(lo, hi)
+        if offset or limit is not None:
+            stop = None if limit is None else offset + limit
+            pairs = islice(pairs, offset, stop)
+        return pairs
+
+    def scan(self, lo, hi):
+        if not self.root:
+            return
+        node = self.pool.get(self.root, pin=False)
+        while not node.is_leaf:
+            i = 0 if lo is None else bisect_right(node.keys, lo)
+            node = self.pool.get(node.ptrs[i], pin=False)
+        i = 0 if lo is None else bisect_left(node.keys, lo)
+        while True:
+            keys = node.keys
+            j = len(keys) if hi is None else bisect_right(keys, hi)
+            nxt = node.next
+            yield from zip(keys[i:j], node.ptrs[i:j])
+            if j < len(keys) or not nxt:
+                return
+            node = self.pool.get(nxt, pin=False)
+            i = 0
+
+    def range(self, rid_1, rid_2):
+        return [rid for rid, _ in self.scan(rid_1, rid_2)]
+
+    def inorder(self):
+        return [rid for rid, _ in self.scan(None, None)]
@@ -0,0 +1,375 @@
+import math
+import threading
+import weakref
+from bisect import bisect_left, bisect_right
+from itertools import islice
+
+
+class PersistentNode():
+    """ A node that is never changed once a version referencing it exists.
+
+    `txn` is the write transaction that created the node; only that
+    transaction may modify it in place. Nodes have no parent or sibling
+    pointers, so a new version shares every node off the path it copied.
+    """
+    __slots__ = ('txn', 'is_leaf', 'keys', 'ptrs')
+
+    def __init__(self, txn, is_leaf=True, keys=None, ptrs=None) -> None:
+        self.txn = txn
+        self.is_leaf = is_leaf
+        self.keys = keys if keys is not None else []
+        self.ptrs = ptrs if ptrs is not None else []
+
+    def copy(self, txn):
+        return PersistentNode(txn, self.is_leaf, self.keys[:], self.ptrs[:])
+
+    def __repr__(self) -> str:
+        return f"PersistentNode({self.keys})"
+
+
+class Snapshot():
+    """ An immutable, point-in-time view of a VersionedBPlusTree.
+
+    A snapshot only holds a reference to the root of its version, so taking
+    one is O(1) and reads need no locks. The nodes of an old version are
+    freed by reference counting once release() (or garbage collection)
+    drops the last snapshot that reaches them.
+    """
+
+    def __init__(self, root, size, version) -> None:
+        self.root = root
+        self.size = size
+        self.version = version
+
+    def __len__(self):
+        return self.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def release(self):
+        self.root = None
+        self.size = 0
+
+    def find_leaf(self, rid):
+        node = self.root
+        while not node.is_leaf:
+            node = node.ptrs[bisect_right(node.keys, rid)]
+        return node
+
+    def search(self, rid):
+        if self.root is None:
+            return None
+        node = self.find_leaf(rid)
+        k = bisect_left(node.keys, rid)
+        if k < len(node.keys) and node.keys[k] == rid:
+            return node.ptrs[k]
+        return None
+
+    def __contains__(self, rid):
+        if self.root is None:
+            return False
+        keys = self.find_leaf(rid).keys
+        k = bisect_left(keys, rid)
+        return k < len(keys) and keys[k] == rid
+
+    def range(self, rid_1, rid_2):
+        return [rid for rid, _ in self.scan_asc(rid_1, rid_2, (True, True))]
+
+    def items(self, lo=None, hi=None, reverse=False, inclusive=(True, True),
+              limit=None, offset=0):
+        """ Lazily yield (rid, data) pairs of this version in rid order. """
+        scan = self.scan_desc if reverse else self.scan_asc
+        pairs = scan(lo, hi, inclusive)
+        if offset or limit is not None:
+            stop = None if limit is None else offset + limit
+            pairs = islice(pairs, offset, stop)
+        return pairs
+
+    def scan_asc(self, lo, hi, inclusive):
+        node = self.root
+        if node is None:
+            return
+        stack = []                    # (inode, child index) pairs on the path.
+        while not node.is_leaf:
+            i = 0 if lo is None else bisect_right(node.keys, lo)
+            stack.append((node, i))
+            node = node.ptrs[i]
+        if lo is None:
+            i = 0
+        else:
+            i = (bisect_left if inclusive[0] else bisect_right)(node.keys, lo)
+        stop = bisect_right if inclusive[1] else bisect_left
+        while True:
+            keys = node.keys
+            j = len(keys) if hi is None else stop(keys, hi)
+            yield from zip(keys[i:j], node.ptrs[i:j])
+            if j < len(keys):
+                return
+            while stack:                        # Climb to the next subtree ...
+                parent, k = stack.pop()
+                if k + 1 < len(parent.ptrs):
+                    stack.append((parent, k + 1))
+                    node = parent.ptrs[k + 1]
+                    break
+            else:
+                return
+            while not node.is_leaf:           # ... and down to its first leaf.
+                stack.append((node, 0))
+                node = node.ptrs[0]
+            i = 0
+
+    def scan_desc(self, lo, hi, inclusive):
+        node = self.root
+        if node is None:
+            return
+        stack = []
+        while not node.is_leaf:
+            i = len(node.keys) if hi is None else bisect_right(node.keys, hi)
+            stack.append((node, i))
+            node = node.ptrs[i]
+        if hi is None:
+            j = len(node.keys)
+        else:
+            j = (bisect_right if inclusive[1] else bisect_left)(node.keys, hi)
+        stop = bisect_left if inclusive[0] else bisect_right
+        while True:
+            keys = node.keys
+            i = 0 if lo is None else stop(keys, lo)
+            yield from zip(reversed(keys[i:j]), reversed(node.ptrs[i:j]))
+            if i > 0:
+                return
+            while stack:
+                parent, k = stack.pop()
+                if k > 0:
+                    stack.append((parent, k - 1))
+                    node = parent.ptrs[k - 1]
+                    break
+            else:
+                return
+            while not node.is_leaf:
+                stack.append((node, len(node.ptrs) - 1))
+                node = node.ptrs[-1]
+            j = len(node.keys)
+
+    def inorder(self):
+        return [rid for rid, _ in self.scan_asc(None, None, (True, True))]
+
+    def iter_inorder(self):
+        return (rid for rid, _ in self.scan_asc(None, None, (True, True)))
+
+
+class VersionedBPlusTree():
+    """ A B+ tree whose writers never block readers (MVCC).
+
+    Every write copies only the root-to-leaf path it touches and then
+    publishes the new version by swapping a single `head` reference, so
+    readers, and any snapshot() taken earlier, keep seeing the version they
+    started on. Writers are serialized by a lock. Within one write (or one
+    insert_many/delete_many batch) a node is copied at most once; later
+    changes in the same batch modify the copy in place.
+    """
+
+    def __init__(self, deg) -> None:
+        if deg < 3:
+            raise ValueError("deg must be at least 3")
+        self.deg = deg
+        self.min_node_size = math.ceil(deg / 2) - 1
+        self.head = Snapshot(None, 0, 0)               # The published version.
+        self.lock = threading.Lock()
+        self.txn = 0
+        self.draft = None                     # Root being built by the writer.
+        self.count = 0
+        self.snapshots = weakref.WeakSet()        # Snapshots not yet released.
+
+    def __len__(self):
+        return self.head.size
+
+    # ----------------------------------------------------------------------- #
+    #                                VERSIONS                                 #
+    # ----------------------------------------------------------------------- #
+
+    @property
+    def version(self):
+        return self.head.version
+
+    def snapshot(self):
+        """ Return an O(1), immutable view of the current version. """
+        head = self.head
+        snap = Snapshot(head.root, head.size, head.version)
+        self.snapshots.add(snap)
+        return snap
+
+    def begin(self):
+        self.txn += 1
+        self.draft = self.head.root
+        self.count = self.head.size
+
+    def publish(self):
+        if self.draft is not self.head.root:
+            self.head = Snapshot(self.draft, self.count,
+                                 self.head.version + 1)
+        self.draft = None
+
+    def own(self, node):
+        """ Return a copy of node that this transaction may modify. """
+        if node.txn == self.txn:
+            return node                          # Created by this transaction.
+        return node.copy(self.txn)
+
+    # ----------------------------------------------------------------------- #
+    #                                 WRITES                                  #
+    # ----------------------------------------------------------------------- #
+
+    def insert(self, rid, data=True):
+        with self.lock:
+            self.begin()
+            status = self.put(rid, data)
+            self.publish()
+        return status
+
+    def delete(self, rid):
+        with self.lock:
+            self.begin()
+            status = self.remove(rid)
+            self.publish()
+        return status
+
+    def insert_many(self, pairs):
+        """ Insert a batch of (rid, data) pairs as one new version. """
+        with self.lock:
+            self.begin()
+            result = [self.put(rid, data) for rid, data in pairs]
+            self.publish()
+        return result
+
+    def delete_many(self, rids):
+        """ Delete a batch of rids as one new version. """
+        with self.lock:
+            self.begin()
+            result = [self.remove(rid) for rid in rids]
+            self.publish()
+        return result
+
+    def descend(self, rid):
+        path = []
+        node = self.draft
+        while not node.is_leaf:
+            i = bisect_right(node.keys, rid)
+            path.append((node, i))
+            node = node.ptrs[i]
+        return path, node
+
+    def put(self, rid, data):
+        if self.draft is None:
+            self.draft = PersistentNode(self.txn)
+        path, leaf = self.descend(rid)
+        i = bisect_left(leaf.keys, rid)
+        if i < len(leaf.keys) and leaf.keys[i] == rid:
+            return False                                   # Nothing is copied.
+        child = self.own(leaf)
+        child.keys.insert(i, rid)
+        child.ptrs.insert(i, data)
+        for parent, k in reversed(path):             # Copy the path bottom-up.
+            parent = self.own(parent)
+            parent.ptrs[k] = child
+            if len(child.keys) == self.deg:
+                sep, right = self.split(child)
+                parent.keys.insert(k, sep)
+                parent.ptrs.insert(k + 1, right)
+            child = parent
+        if len(child.keys) == self.deg:                         # Grow a level.
+            sep, right = self.split(child)
+            child = PersistentNode(self.txn, False, [sep], [child, right])
+        self.draft = child
+        self.count += 1
+        return True
+
+    def split(self, node):
+        """ Split an owned, full node in two; returns (separator, right). """
+        mid = len(node.keys) // 2
+        if node.is_leaf:
+            right = PersistentNode(self.txn, True, node.keys[mid:],
+                                   node.ptrs[mid:])
+            sep = right.keys[0]
+            del node.ptrs[mid:]
+        else:
+            right = PersistentNode(self.txn, False, node.keys[mid + 1:],
+                                   node.ptrs[mid + 1:])
+            sep = node.keys[mid]
+            del node.ptrs[mid + 1:]
+        del node.keys[mid:]
+        return sep, right
+
+    def remove(self, rid):
+        if self.draft is None:
+            return False
+        path, leaf = self.descend(rid)
+        i = bisect_left(leaf.keys, rid)
+        if i == len(leaf.keys) or leaf.keys[i] != rid:
+            return False                                   # Nothing is copied.
+        child = self.own(leaf)
+        child.keys.pop(i)
+        child.ptrs.pop(i)
+        for parent, k in reversed(path):
+            parent = self.own(parent)
+            parent.ptrs[k] = child
+            if len(child.keys) < self.min_node_size:
+                self.fix(parent, k)
+            child = parent
+        if not child.keys:                          # Shrink or empty the tree.
+            child = None if child.is_leaf else child.ptrs[0]
+        self.draft = child
+        self.count -= 1
+        return True
+
+    def fix(self, parent, k):
+        """ Merge or rebalance the underfull child k of an owned parent. """
+        s = k - 1 if k > 0 else k          # Pair with the left sibling if any.
+        left = parent.ptrs[s] = self.own(parent.ptrs[s])
+        right = parent.ptrs[s + 1] = self.own(parent.ptrs[s + 1])
+        if left.is_leaf:
+            keys = left.keys + right.keys
+        else:
+            keys = left.keys + [parent.keys[s]] + right.keys
+        ptrs = left.ptrs + right.ptrs
+        if len(keys) < self.deg:                              # Merge the pair.
+            left.keys, left.ptrs = keys, ptrs
+            del parent.keys[s]
+            del parent.ptrs[s + 1]
+            return None
+        mid = len(keys) // 2                                 # Split it evenly.
+        if left.is_leaf:
+            left.keys, right.keys = keys[:mid], keys[mid:]
+            left.ptrs, right.ptrs = ptrs[:mid], ptrs[mid:]
+            parent.keys[s] = right.keys[0]
+        else:
+            left.keys, right.keys = keys[:mid], keys[mid + 1:]
+            left.ptrs, right.ptrs = ptrs[:mid + 1], ptrs[mid + 1:]
+            parent.keys[s] = keys[mid]
+        return None
+
+    # ----------------------------------------------------------------------- #
+    #                                  READS                                  #
+    # ----------------------------------------------------------------------- #
+
+    def search(self, rid):
+        return self.head.search(rid)
+
+    def __contains__(self, rid):
+        return rid in self.head
+
+    def range(self, rid_1, rid_2):
+        return self.head.range(rid_1, rid_2)
+
+    def items(self, *args, **kwargs):
+        return self.head.items(*args, **kwargs)
+
+    def inorder(self):
+        return self.head.inorder()
+
+    def iter_inorder(self):
+        return self.head.iter_inorder()
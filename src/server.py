@@ -0,0 +1,251 @@
+import asyncio
+import itertools
+import struct
+
+from .bplus import BPlusTree
+
+PORT = 7411
+INSERT, SEARCH, DELETE, RANGE = range(1, 5)                    # Request codes.
+OK, MISSING, CHUNK, END, ERROR = range(5)                     # Response codes.
+REQUEST = struct.Struct("!BIq")                                  # op, id, rid.
+RESPONSE = struct.Struct("!BII")                    # status, id, payload size.
+LENGTH = struct.Struct("!I")
+BOUND = struct.Struct("!q")
+ENTRY = struct.Struct("!qI")                  # rid, value size; value follows.
+BATCH_LIMIT = 1024                   # Point requests coalesced into one batch.
+CHUNK_PAIRS = 256                             # Pairs per streamed range frame.
+HIGH_WATER = 1 << 20                # Unsent bytes that make a connection wait.
+
+
+def pack_entries(pairs):
+    parts = []
+    for rid, data in pairs:
+        parts.append(ENTRY.pack(rid, len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def unpack_entries(payload):
+    pairs = []
+    pos = 0
+    while pos < len(payload):
+        rid, size = ENTRY.unpack_from(payload, pos)
+        pos += ENTRY.size
+        pairs.append((rid, payload[pos:pos + size]))
+        pos += size
+    return pairs
+
+
+class TreeServer():
+    """ Serve one BPlusTree of int64 rids and bytes values over a socket.
+
+    Every request is framed as (op, id, rid) plus an operand: the value of
+    an insert or the upper bound of a range. Replies carry the request id,
+    so a client may pipeline many requests on one connection and match
+    the replies as they come. Point requests from every connection are
+    queued and applied at the next turn of the event loop as batches:
+    each run of consecutive inserts, searches or deletes becomes one
+    insert_many, search_many or delete_many call, which keeps the order
+    of the requests. A range is streamed in CHUNK_PAIRS frames, resuming
+    after the last rid sent, and waits for the socket to drain between
+    frames so a slow reader holds back only its own stream.
+    """
+
+    def __init__(self, tree=None, batch_limit=BATCH_LIMIT) -> None:
+        self.tree = tree if tree is not None else BPlusTree(64)
+        self.batch_limit = batch_limit
+        self.pending = []                         # (op, id, rid, arg, writer).
+        self.scheduled = False
+        self.batches = 0
+        self.requests = 0
+
+    async def start(self, host="127.0.0.1", port=PORT, path=None):
+        """ Listen on a Unix socket at path, or else on host:port. """
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path)
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                head = await reader.readexactly(REQUEST.size)
+                op, ident, rid = REQUEST.unpack(head)
+                if op == INSERT:
+                    size, = LENGTH.unpack(await reader.readexactly(4))
+                    arg = await reader.readexactly(size)
+                elif op == RANGE:
+                    arg, = BOUND.unpack(await reader.readexactly(8))
+                    asyncio.ensure_future(self.stream(ident, rid, arg,
+                                                      writer))
+                    continue
+                elif op in (SEARCH, DELETE):
+                    arg = None
+                else:
+                    self.reply(writer, ERROR, ident, b"unknown op")
+                    break
+                self.queue((op, ident, rid, arg, writer))
+                if writer.transport.get_write_buffer_size() > HIGH_WATER:
+                    await writer.drain()           # The client is not reading.
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def reply(self, writer, status, ident, payload=b""):
+        if not writer.is_closing():
+            writer.write(RESPONSE.pack(status, ident, len(payload)) + payload)
+
+    def queue(self, request):
+        self.pending.append(request)
+        if len(self.pending) >= self.batch_limit:
+            self.flush()
+        elif not self.scheduled:
+            self.scheduled = True
+            asyncio.get_running_loop().call_soon(self.flush)
+
+    def flush(self):
+        """ Apply the queued point requests as one batch per run of ops. """
+        self.scheduled = False
+        pending, self.pending = self.pending, []
+        if not pending:
+            return
+        self.batches += 1
+        self.requests += len(pending)
+        tree = self.tree
+        start = 0
+        for end in range(1, len(pending) + 1):
+            if end < len(pending) and pending[end][0] == pending[start][0]:
+                continue
+            run = pending[start:end]
+            op = run[0][0]
+            if op == SEARCH:
+                values = tree.search_many([r[2] for r in run])
+                for (_, ident, _, _, writer), data in zip(run, values):
+                    if data is None:
+                        self.reply(writer, MISSING, ident)
+                    else:
+                        self.reply(writer, OK, ident, data)
+            else:
+                if op == INSERT:
+                    flags = tree.insert_many([(r[2], r[3]) for r in run])
+                else:
+                    flags = tree.delete_many([r[2] for r in run])
+                for (_, ident, _, _, writer), flag in zip(run, flags):
+                    self.reply(writer, OK if flag else MISSING, ident)
+            start = end
+
+    async def stream(self, ident, lo, hi, writer):
+        inclusive = (True, True)
+        try:
+            while True:
+                pairs = list(self.tree.items(lo, hi, inclusive=inclusive,
+                                             limit=CHUNK_PAIRS))
+                if pairs:
+                    self.reply(writer, CHUNK, ident, pack_entries(pairs))
+                    await writer.drain()                        # Backpressure.
+                if len(pairs) < CHUNK_PAIRS:
+                    break
+                lo, inclusive = pairs[-1][0], (False, True)
+            self.reply(writer, END, ident)
+        except ConnectionError:
+            pass
+
+
+class TreeClient():
+    """ An asyncio client for TreeServer that pipelines its requests.
+
+    Any number of calls may be in flight at once; a background task reads
+    the replies and resolves them by request id. range() is an async
+    generator. Its frames are buffered in a bounded queue, so a consumer
+    that falls behind stops the reader and, through TCP, the server.
+    """
+
+    def __init__(self, reader, writer) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.ids = itertools.count(1)
+        self.waiting = {}                              # id -> future or queue.
+        self.listener = asyncio.ensure_future(self.listen())
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=PORT, path=None):
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def close(self):
+        self.writer.close()
+        self.listener.cancel()
+        try:
+            await self.listener
+        except asyncio.CancelledError:
+            pass
+
+    async def listen(self):
+        try:
+            while True:
+                head = await self.reader.readexactly(RESPONSE.size)
+                status, ident, size = RESPONSE.unpack(head)
+                payload = await self.reader.readexactly(size)
+                waiter = self.waiting.get(ident)
+                if isinstance(waiter, asyncio.Queue):
+                    if status != CHUNK:
+                        del self.waiting[ident]
+                    await waiter.put((status, payload))
+                elif waiter is not None:
+                    del self.waiting[ident]
+                    if not waiter.done():
+                        waiter.set_result((status, payload))
+        except (asyncio.IncompleteReadError, ConnectionError) as exc:
+            for waiter in self.waiting.values():
+                if isinstance(waiter, asyncio.Queue):
+                    waiter.put_nowait((ERROR, str(exc).encode()))
+                elif not waiter.done():
+                    waiter.set_exception(exc)
+
+    def send(self, op, rid, operand, waiter):
+        ident = next(self.ids)
+        self.waiting[ident] = waiter
+        self.writer.write(REQUEST.pack(op, ident, rid) + operand)
+        return ident
+
+    async def call(self, op, rid, operand=b""):
+        reply = asyncio.get_running_loop().create_future()
+        self.send(op, rid, operand, reply)
+        status, payload = await reply
+        if status == ERROR:
+            raise RuntimeError(payload.decode())
+        return status, payload
+
+    async def insert(self, rid, data=b""):
+        status, _ = await self.call(INSERT, rid,
+                                    LENGTH.pack(len(data)) + bytes(data))
+        return status == OK
+
+    async def search(self, rid):
+        status, payload = await self.call(SEARCH, rid)
+        return payload if status == OK else None
+
+    async def delete(self, rid):
+        status, _ = await self.call(DELETE, rid)
+        return status == OK
+
+    async def range(self, lo, hi, buffered=4):
+        """ Yield the (rid, value) pairs with lo <= rid <= hi in order. """
+        frames = asyncio.Queue(buffered)
+        ident = self.send(RANGE, lo, BOUND.pack(hi), frames)
+        try:
+            while True:
+                status, payload = await frames.get()
+                if status == END:
+                    return
+                if status == ERROR:
+                    raise RuntimeError(payload.decode())
+                for pair in unpack_entries(payload):
+                    yield pair
+        finally:
+            if self.waiting.pop(ident, None) is not None:      # Stopped early:
+                while not frames.empty():            # unblock the listener and
+                    frames.get_nowait()                # drop any later frames.
@@ -0,0 +1,273 @@
+import os
+import multiprocessing
+from bisect import bisect_right
+
+from .bplus import BPlusTree
+
+
+def pop_low(tree, k):
+    """ Remove and return the k smallest (rid, data) pairs of tree. """
+    pairs = list(tree.items(limit=k))
+    if pairs:
+        tree.delete_range(pairs[0][0], pairs[-1][0])
+    return pairs
+
+
+def pop_high(tree, k):
+    """ Remove and return the k largest (rid, data) pairs, ascending. """
+    pairs = list(tree.items(reverse=True, limit=k))[::-1]
+    if pairs:
+        tree.delete_range(pairs[0][0], pairs[-1][0])
+    return pairs
+
+
+def first_rid(tree):
+    for rid, _ in tree.items(limit=1):
+        return rid
+    return None
+
+
+COMMANDS = {                      # Requests a shard worker knows how to serve.
+    "insert": BPlusTree.insert,
+    "delete": BPlusTree.delete,
+    "search": BPlusTree.search,
+    "range": BPlusTree.range,
+    "len": BPlusTree.__len__,
+    "insert_many": BPlusTree.insert_many,
+    "delete_many": BPlusTree.delete_many,
+    "search_many": BPlusTree.search_many,
+    "inorder": BPlusTree.inorder,
+    "range_many": lambda tree, queries: [tree.range(lo, hi)
+                                         for lo, hi in queries],
+    "bulk": lambda tree, pairs: tree.insert_many(pairs) and None,
+    "pop_low": pop_low,
+    "pop_high": pop_high,
+    "first_rid": first_rid,
+}
+
+
+def serve(conn, deg, kwargs):
+    """ Own one shard: answer (command, args) requests until None comes. """
+    tree = BPlusTree(deg, **kwargs)
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        name, args = request
+        try:
+            reply = (True, COMMANDS[name](tree, *args))
+        except Exception as exc:                     # Re-raised in the caller.
+            reply = (False, exc)
+        conn.send(reply)
+    conn.close()
+
+
+class ShardedBPlusTree():
+    """ A key space range-partitioned over BPlusTrees in worker processes.
+
+    Shard i holds the rids r with bounds[i - 1] <= r < bounds[i], and each
+    shard's tree lives in its own process, so the shards work in parallel
+    instead of sharing one GIL. Point operations go to the owning shard.
+    Batch operations (insert_many, search_many, range_many) send one
+    request to every shard involved before waiting for any reply, and a
+    range is split across the shards it spans; since shards are ordered,
+    their sorted outputs merge by concatenation. Without `bounds` every
+    rid starts in shard 0 until rebalance() picks split points.
+
+    Every request and reply is pickled, so parallelism only pays off for
+    batches whose per-shard work outweighs the transfer.
+    """
+
+    def __init__(self, deg, shards=None, bounds=None, **kwargs) -> None:
+        self.deg = deg
+        self.bounds = sorted(bounds) if bounds else []
+        n = shards or (len(self.bounds) + 1 if bounds else os.cpu_count())
+        if len(self.bounds) > n - 1:
+            raise ValueError("need at most shards - 1 bounds")
+        self.conns = []
+        self.workers = []
+        for _ in range(n):
+            conn, child = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=serve, daemon=True,
+                                             args=(child, deg, kwargs))
+            worker.start()
+            child.close()
+            self.conns.append(conn)
+            self.workers.append(worker)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for conn, worker in zip(self.conns, self.workers):
+            try:
+                conn.send(None)
+            except OSError:                              # Worker already gone.
+                pass
+            conn.close()
+            worker.join()
+        self.conns = []
+        self.workers = []
+
+    # ----------------------------------------------------------------------- #
+    #                                 ROUTING                                 #
+    # ----------------------------------------------------------------------- #
+
+    def shard_of(self, rid):
+        return bisect_right(self.bounds, rid)
+
+    def reply(self, conn):
+        ok, result = conn.recv()
+        if not ok:
+            raise result
+        return result
+
+    def call(self, shard, name, *args):
+        self.conns[shard].send((name, args))
+        return self.reply(self.conns[shard])
+
+    def scatter(self, requests):
+        """ Send {shard: (name, args)} at once; return {shard: result}. """
+        for shard, request in requests.items():
+            self.conns[shard].send(request)
+        return {shard: self.reply(self.conns[shard]) for shard in requests}
+
+    def partition(self, rids):
+        """ Return {shard: [input positions]} for a batch of rids. """
+        groups = {}
+        for i, rid in enumerate(rids):
+            groups.setdefault(bisect_right(self.bounds, rid), []).append(i)
+        return groups
+
+    def gather(self, name, items, key, *args):
+        """ Run a batch command on the shards that items route to. """
+        items = list(items)
+        groups = self.partition([key(item) for item in items])
+        replies = self.scatter({
+            shard: (name, ([items[i] for i in pos],) + args)
+            for shard, pos in groups.items()})
+        result = [None] * len(items)
+        for shard, pos in groups.items():
+            for i, value in zip(pos, replies[shard]):
+                result[i] = value
+        return result
+
+    # ----------------------------------------------------------------------- #
+    #                               OPERATIONS                                #
+    # ----------------------------------------------------------------------- #
+
+    def insert(self, rid, data=True):
+        return self.call(self.shard_of(rid), "insert", rid, data)
+
+    def delete(self, rid):
+        return self.call(self.shard_of(rid), "delete", rid)
+
+    def search(self, rid):
+        return self.call(self.shard_of(rid), "search", rid)
+
+    def __len__(self):
+        return sum(self.sizes())
+
+    def broadcast(self, name, *args):
+        """ Run a command on every shard; return the results in order. """
+        replies = self.scatter({i: (name, args)
+                                for i in range(len(self.conns))})
+        return [replies[i] for i in range(len(self.conns))]
+
+    def sizes(self):
+        return self.broadcast("len")
+
+    def insert_many(self, pairs):
+        return self.gather("insert_many", pairs, lambda pair: pair[0])
+
+    def delete_many(self, rids):
+        return self.gather("delete_many", rids, lambda rid: rid)
+
+    def search_many(self, rids, default=None):
+        return self.gather("search_many", rids, lambda rid: rid, default)
+
+    def span(self, lo, hi):
+        """ Return the shards that may hold rids in [lo, hi]. """
+        return range(bisect_right(self.bounds, lo),
+                     bisect_right(self.bounds, hi) + 1)
+
+    def range(self, rid_1, rid_2):
+        return self.range_many([(rid_1, rid_2)])[0]
+
+    def range_many(self, queries):
+        """ Answer many range queries with one request per shard. """
+        queries = list(queries)
+        asks = {}
+        for q, (lo, hi) in enumerate(queries):
+            if hi < lo:
+                continue
+            for shard in self.span(lo, hi):
+                asks.setdefault(shard, []).append(q)
+        replies = self.scatter({
+            shard: ("range_many", ([queries[q] for q in qs],))
+            for shard, qs in asks.items()})
+        result = [[] for _ in queries]
+        for shard in sorted(asks):                # Shards are in rid order, so
+            for q, rids in zip(asks[shard], replies[shard]):     # concatenate.
+                result[q].extend(rids)
+        return result
+
+    def inorder(self):
+        result = []
+        for rids in self.broadcast("inorder"):
+            result.extend(rids)
+        return result
+
+    # ----------------------------------------------------------------------- #
+    #                                REBALANCE                                #
+    # ----------------------------------------------------------------------- #
+
+    def rebalance(self, skew=1.5):
+        """ Even out the shard sizes if the largest exceeds skew x the mean.
+
+        Boundaries are fixed left to right: whenever the shards left of a
+        boundary hold more (or fewer) rids than their even share, the
+        surplus is moved across it from the nearest shards, taking the
+        highest (or lowest) rids so every shard keeps a contiguous range.
+        Returns whether anything moved.
+        """
+        sizes = self.sizes()
+        total = sum(sizes)
+        n = len(sizes)
+        if not total or max(sizes) <= skew * total / n:
+            return False
+        bounds = self.bounds + [None] * (n - 1 - len(self.bounds))
+        before = 0
+        for b in range(1, n):
+            before += sizes[b - 1]
+            need = b * total // n - before                   # Rids to pull in.
+            if need < 0:
+                pairs = self.call(b - 1, "pop_high", -need)
+                self.call(b, "bulk", pairs)
+                sizes[b - 1] += need
+                sizes[b] -= need
+                bounds[b - 1] = pairs[0][0]
+            elif need > 0:
+                moved = []
+                src = b
+                while len(moved) < need:           # Drain shards to the right.
+                    take = min(need - len(moved), sizes[src])
+                    if take:
+                        moved.extend(self.call(src, "pop_low", take))
+                        sizes[src] -= take
+                    src += 1
+                self.call(b - 1, "bulk", moved)
+                sizes[b - 1] += need
+                for s in range(b, src):           # Emptied shards start at the
+                    rid = self.call(s, "first_rid")       # next remaining rid.
+                    nxt = s
+                    while rid is None:
+                        nxt += 1
+                        rid = self.call(nxt, "first_rid")
+                    bounds[s - 1] = rid
+            before += need
+        self.bounds = bounds
+        return True
@@ -0,0 +1,307 @@
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+
+from .bplus import BPlusTree
+
+INSERT = 1
+DELETE = 2
+RECORD = struct.Struct("<II")                          # crc32, payload length.
+SNAPSHOT_CHUNK = 4096                           # (rid, data) pairs per pickle.
+SYNC_MODES = ("always", "group", "none")
+
+
+class WriteAheadLog():
+    """ An append-only log of tree mutations.
+
+    Every record is written before the mutation is applied. How often the
+    log is fsynced is set by `sync`:
+
+    always: fsync after every append() or append_many() call (lowest
+            throughput, nothing is lost).
+    group:  fsync once `group_size` records are pending or `group_interval`
+            seconds after the first unsynced record, whichever is first. A
+            timer thread covers the interval when no more writes arrive, so
+            a crash loses at most that window.
+    none:   leave flushing to the OS.
+
+    commit() forces an fsync of everything appended so far. A torn record
+    at the tail (from a crash mid-write) fails its checksum and is dropped
+    when the log is reopened.
+    """
+
+    def __init__(self, path, sync="group", group_size=64,
+                 group_interval=0.01) -> None:
+        if sync not in SYNC_MODES:
+            raise ValueError(f"sync must be one of {SYNC_MODES}")
+        self.path = path
+        self.sync = sync
+        self.group_size = group_size
+        self.group_interval = group_interval
+        self.pending = 0                     # Records written but not fsynced.
+        self.last_sync = time.monotonic()
+        self.appended = 0
+        self.syncs = 0
+        self.lock = threading.Lock()            # The timer thread commits too.
+        self.timer = None
+        valid = self.valid_length()
+        self.fp = open(path, "ab")
+        if self.fp.tell() != valid:                  # Drop a torn tail record.
+            self.fp.truncate(valid)
+            self.fp.seek(valid)
+
+    def valid_length(self):
+        length = 0
+        for _, end in self.scan():
+            length = end
+        return length
+
+    def scan(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as fp:
+            data = fp.read()
+        offset = 0
+        while offset + RECORD.size <= len(data):
+            crc, size = RECORD.unpack_from(data, offset)
+            start = offset + RECORD.size
+            payload = data[start:start + size]
+            if len(payload) < size or zlib.crc32(payload) != crc:
+                return                                  # Torn or corrupt tail.
+            offset = start + size
+            yield payload, offset
+
+    def records(self):
+        """ Yield every intact (op, rid, data) record in append order. """
+        for payload, _ in self.scan():
+            yield pickle.loads(payload)
+
+    def append(self, op, rid, data=None):
+        payload = pickle.dumps((op, rid, data), pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.fp.write(RECORD.pack(zlib.crc32(payload), len(payload)))
+            self.fp.write(payload)
+            self.appended += 1
+            self.pending += 1
+            self.settle()
+        return None
+
+    def append_many(self, records):
+        """ Write (op, rid, data) records together, fsyncing at most once. """
+        payloads = [pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+                    for record in records]
+        if not payloads:
+            return None
+        with self.lock:
+            for payload in payloads:
+                self.fp.write(RECORD.pack(zlib.crc32(payload), len(payload)))
+                self.fp.write(payload)
+            self.appended += len(payloads)
+            self.pending += len(payloads)
+            self.settle()
+        return None
+
+    def settle(self):
+        """ Sync what the mode calls for after an append; the caller holds
+        the lock.
+        """
+        if self.sync == "always":
+            self.sync_pending()
+        elif self.sync == "group":
+            waited = time.monotonic() - self.last_sync
+            if self.pending >= self.group_size or \
+                    waited >= self.group_interval:
+                self.sync_pending()
+            elif self.timer is None:                   # Bound the idle window.
+                self.timer = threading.Timer(self.group_interval - waited,
+                                             self.expire)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def expire(self):
+        with self.lock:
+            self.timer = None
+            if self.pending and not self.fp.closed:
+                self.sync_pending()
+
+    def commit(self):
+        with self.lock:
+            self.sync_pending()
+        return None
+
+    def sync_pending(self):
+        """ Flush and fsync the pending records; the caller holds the lock. """
+        self.fp.flush()
+        if self.sync != "none" and self.pending:
+            os.fsync(self.fp.fileno())
+            self.syncs += 1
+        self.pending = 0
+        self.last_sync = time.monotonic()
+        return None
+
+    def truncate(self):
+        with self.lock:
+            self.fp.flush()
+            self.fp.truncate(0)
+            self.fp.seek(0)
+            os.fsync(self.fp.fileno())
+            self.pending = 0
+        return None
+
+    def close(self):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            self.sync_pending()
+            self.fp.close()
+
+
+class LoggedBPlusTree():
+    """ A BPlusTree made durable by a snapshot plus a write-ahead log.
+
+    State lives in `<path>.snap` (the last checkpoint) and `<path>.wal`
+    (every mutation since). Opening replays the log on top of the snapshot.
+    checkpoint() writes a fresh snapshot and truncates the log, either on
+    demand or automatically every `checkpoint_every` logged mutations.
+    Reads go straight to the in-memory tree.
+    """
+
+    def __init__(self, path, deg, sync="group", group_size=64,
+                 group_interval=0.01, checkpoint_every=None) -> None:
+        self.snap_path = path + ".snap"
+        self.checkpoint_every = checkpoint_every
+        self.tree = self.load_snapshot(deg)
+        self.wal = WriteAheadLog(path + ".wal", sync, group_size,
+                                 group_interval)
+        self.since_checkpoint = self.recover()
+
+    def load_snapshot(self, deg):
+        if not os.path.exists(self.snap_path):
+            return BPlusTree(deg)
+        with open(self.snap_path, "rb") as fp:
+            deg = pickle.load(fp)
+            return BPlusTree.bulk_load(deg, self.read_chunks(fp))
+
+    def read_chunks(self, fp):
+        while True:
+            try:
+                chunk = pickle.load(fp)
+            except EOFError:
+                return
+            yield from chunk
+
+    def recover(self):
+        """ Replay the log over the snapshot; returns the records applied. """
+        replayed = 0
+        for op, rid, data in self.wal.records():
+            if op == INSERT:
+                self.tree.insert(rid, data)
+            elif op == DELETE:
+                self.tree.delete(rid)
+            replayed += 1
+        return replayed
+
+    def logged(self, count):
+        self.since_checkpoint += count
+        if self.checkpoint_every and \
+                self.since_checkpoint >= self.checkpoint_every:
+            self.checkpoint()
+
+    def validate(self, rid):
+        """ Raise as the tree would for rid, before anything is logged, so
+        a rejected mutation never reaches the log (and never fails replay).
+        """
+        root = self.tree.root
+        if root is not None and root.keys:
+            rid < root.keys[0]            # TypeError if rid can't be compared.
+
+    def insert(self, rid, data=True):
+        self.validate(rid)
+        self.wal.append(INSERT, rid, data)
+        status = self.tree.insert(rid, data)
+        self.logged(1)
+        return status
+
+    def delete(self, rid):
+        self.validate(rid)
+        self.wal.append(DELETE, rid)
+        status = self.tree.delete(rid)
+        self.logged(1)
+        return status
+
+    def insert_many(self, pairs):
+        pairs = list(pairs)
+        if pairs:                       # min() also needs the rids to compare.
+            self.validate(min(rid for rid, _ in pairs))
+        self.wal.append_many((INSERT, rid, data) for rid, data in pairs)
+        result = self.tree.insert_many(pairs)
+        self.logged(len(pairs))
+        return result
+
+    def delete_many(self, rids):
+        rids = list(rids)
+        if rids:
+            self.validate(min(rids))
+        self.wal.append_many((DELETE, rid, None) for rid in rids)
+        result = self.tree.delete_many(rids)
+        self.logged(len(rids))
+        return result
+
+    def commit(self):
+        self.wal.commit()
+
+    def checkpoint(self):
+        """ Write the whole tree to a new snapshot and truncate the log. """
+        self.wal.commit()
+        tmp_path = self.snap_path + ".tmp"
+        with open(tmp_path, "wb") as fp:
+            pickle.dump(self.tree.deg, fp)
+            chunk = []
+            for pair in self.tree.items():
+                chunk.append(pair)
+                if len(chunk) == SNAPSHOT_CHUNK:
+                    pickle.dump(chunk, fp, pickle.HIGHEST_PROTOCOL)
+                    chunk = []
+            if chunk:
+                pickle.dump(chunk, fp, pickle.HIGHEST_PROTOCOL)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp_path, self.snap_path)           # Atomically swap it in.
+        self.sync_directory()
+        self.wal.truncate()
+        self.since_checkpoint = 0
+
+    def sync_directory(self):
+        if not hasattr(os, "O_DIRECTORY"):                    # Not on Windows.
+            return
+        fd = os.open(os.path.dirname(os.path.abspath(self.snap_path)),
+                     os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        self.wal.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def search(self, rid):
+        return self.tree.search(rid)
+
+    def range(self, rid_1, rid_2):
+        return self.tree.range(rid_1, rid_2)
+
+    def items(self, *args, **kwargs):
+        return self.tree.items(*args, **kwargs)
+
+    def inorder(self):
+        return self.tree.inorder()
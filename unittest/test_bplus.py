@@ -1,6 +1,7 @@
 import os
 import sys
 import unittest
+from array import array
 import random
 from time import process_time
 import random
@@ -31,7 +32,7 @@ class Test(unittest.TestCase):
                 random_rid = random.randint(0, 2**40)
                 status = self.tree.insert(random_rid, random_rid)
             self.assertEqual(self.tree.search(random_rid), random_rid)
-        self.assertEqual(len(self.tree.rid_set), self.size)
+        self.assertEqual(len(self.tree), self.size)
         print("PASS")
 
         print(f"Test BTree inorder list...", end="")
@@ -53,18 +54,259 @@ class Test(unittest.TestCase):
         print("PASS")
 
         print(f"Test BTree deleting & searching {self.size} elements...", end="")
-        old_size = len(self.tree.rid_set)
+        old_size = len(self.tree)
         for i in range(self.size):
-            population = sorted(self.tree.rid_set)
+            population = self.tree.inorder()
             random_rid = random.sample(population, 1)[0]
             self.assertEqual(self.tree.search(random_rid), random_rid)
             self.assertTrue(self.tree.delete(random_rid))
-            new_size = len(self.tree.rid_set)
+            new_size = len(self.tree)
             self.assertGreater(old_size, new_size)
             old_size = new_size
         print("PASS")
         fp.close()
 
+    def test_bulk_load(self):
+        rids = sorted(random.sample(range(2**40), self.size))
+        tree = BPlusTree.bulk_load(3, ((rid, rid) for rid in rids), fill=0.5)
+        self.assertEqual(tree.inorder(), rids)
+        for rid in rids:
+            self.assertEqual(tree.search(rid), rid)
+        for rid in rids[::2]:
+            self.assertTrue(tree.delete(rid))
+        self.assertEqual(tree.inorder(), rids[1::2])
+        with self.assertRaises(ValueError):
+            BPlusTree.bulk_load(3, [(2, 2), (1, 1)])
+
+    def test_insert_delete_many(self):
+        rids = [random.randint(0, 2**12) for _ in range(self.size)]
+        expected = [rid not in rids[:i] for i, rid in enumerate(rids)]
+        self.assertEqual(self.tree.insert_many((r, r) for r in rids), expected)
+        unique = sorted(set(rids))
+        self.assertEqual(self.tree.inorder(), unique)
+        for rid in unique:
+            self.assertEqual(self.tree.search(rid), rid)
+        doomed = unique[::3] + [-1]
+        flags = self.tree.delete_many(doomed)
+        self.assertEqual(flags, [True] * (len(doomed) - 1) + [False])
+        self.assertEqual(self.tree.inorder(), sorted(set(unique) - set(doomed)))
+        self.tree.delete_many(unique)
+        self.assertEqual(self.tree.inorder(), [])
+
+    def test_items(self):
+        rids = list(range(0, 2 * self.size, 2))
+        self.tree.insert_many((rid, -rid) for rid in rids)
+        self.assertEqual(list(self.tree.items(10, 20)),
+                         [(rid, -rid) for rid in range(10, 21, 2)])
+        self.assertEqual(list(self.tree.items(10, 20, inclusive=(False, False))),
+                         [(rid, -rid) for rid in range(12, 19, 2)])
+        self.assertEqual([rid for rid, _ in self.tree.items(hi=9, reverse=True)],
+                         [8, 6, 4, 2, 0])
+        self.assertEqual([rid for rid, _ in self.tree.items(offset=3, limit=2)],
+                         [6, 8])
+        self.assertEqual(list(self.tree.iter_inorder()), rids)
+
+    def test_search_many(self):
+        rids = random.sample(range(2**40), self.size)
+        self.tree.insert_many((rid, -rid) for rid in rids)
+        missing = random.sample(range(2**41, 2**42), 10)
+        batch = rids[::3] + missing + rids[:5]
+        random.shuffle(batch)
+        expected = [self.tree.search(rid) for rid in batch]
+        self.assertEqual(self.tree.search_many(batch), expected)
+        self.assertEqual(self.tree.search_many(missing, default=0), [0] * 10)
+        self.assertEqual(self.tree.search_many(rids), [-rid for rid in rids])
+        self.assertEqual(BPlusTree(3).search_many([1, 2]), [None, None])
+
+    def test_order_stats(self):
+        tree = BPlusTree(4, sums=True)
+        rids = random.sample(range(self.size * 4), self.size)
+        for rid in rids:
+            tree.insert(rid, rid % 10)
+        tree.delete_many(rids[:self.size // 4])
+        for rid in rids[self.size // 4:self.size // 2]:
+            tree.delete(rid)
+        tree.insert_many((rid, rid % 10) for rid in rids[:10])
+        rids = tree.inorder()
+        self.assertEqual(tree.count_range(), len(rids))
+        for k in (0, 1, len(rids) // 2, len(rids) - 1, -1):
+            self.assertEqual(tree.select(k), rids[k])
+            self.assertEqual(tree.rank(rids[k]), k % len(rids))
+        self.assertRaises(IndexError, tree.select, len(rids))
+        lo, hi = rids[10], rids[-10]
+        between = [rid for rid in rids if lo <= rid <= hi]
+        self.assertEqual(tree.count_range(lo, hi), len(between))
+        self.assertEqual(tree.count_range(lo, hi, inclusive=(False, False)),
+                         len(between) - 2)
+        self.assertEqual(tree.count_range(hi, lo), 0)
+        self.assertEqual(tree.sum_range(lo, hi),
+                         sum(rid % 10 for rid in between))
+        self.assertRaises(ValueError, self.tree.rank, 1)
+
+    def test_int64_keys(self):
+        tree = BPlusTree(4, key_type="int64")
+        rids = random.sample(range(-2**60, 2**60), self.size)
+        for rid in rids:
+            self.assertTrue(tree.insert(rid, rid))
+        self.assertFalse(tree.insert(rids[0]))
+        self.assertEqual(tree.inorder(), sorted(rids))
+        self.assertEqual(tree.range(min(rids), max(rids)), sorted(rids))
+        self.assertIsInstance(tree.root.keys, array)
+        self.assertRaises(TypeError, tree.insert, 1.5)
+        self.assertRaises(OverflowError, tree.insert, 2**63)
+        batch = BPlusTree(4, key_type="int64", order_stats=True)
+        pairs = [(rid, rid) for rid in range(10)]
+        self.assertRaises(OverflowError, batch.insert_many,
+                          pairs + [(2**63, 0)])
+        self.assertEqual(len(batch), 0)                 # Nothing was inserted.
+        self.assertIsNone(batch.root)
+        batch.insert_many(pairs)
+        self.assertTrue(all(len(node.keys) < 4 for node in batch.iter_nodes()))
+        self.assertEqual(batch.select(7), 7)
+        self.assertEqual(tree.delete_many(rids[::2]), [True] * (self.size // 2))
+        for rid in rids[1::2]:
+            self.assertEqual(tree.search(rid), rid)
+            self.assertTrue(tree.delete(rid))
+        self.assertEqual(tree.inorder(), [])
+        bulk = BPlusTree.bulk_load(4, ((rid, rid) for rid in sorted(rids)),
+                                   key_type="int64")
+        self.assertEqual(bulk.inorder(), sorted(rids))
+        self.assertRaises(ValueError, BPlusTree, 4, key_type="float")
+
+    def test_memory_and_bloom(self):
+        tree = BPlusTree(8, bloom=True)
+        rids = random.sample(range(2**40), self.size * 2)
+        for rid in rids[:self.size]:
+            self.assertTrue(tree.insert(rid, rid))
+        self.assertFalse(tree.insert(rids[0]))
+        self.assertEqual(len(tree), self.size)
+        for rid in rids[:self.size]:
+            self.assertIn(rid, tree)
+        misses = sum(rid in tree.bloom for rid in rids[self.size:])
+        self.assertLess(misses, self.size // 10)       # ~1% false positives.
+        for rid in rids[self.size:]:
+            self.assertNotIn(rid, tree)
+            self.assertFalse(tree.delete(rid))
+        self.assertEqual(tree.delete_many(rids[:10] * 2), [True] * 10 +
+                         [False] * 10)
+        self.assertEqual(len(tree), self.size - 10)
+        usage = tree.memory_usage()
+        self.assertGreater(usage["keys"], 0)
+        self.assertGreater(usage["bloom"], 0)
+        self.assertEqual(usage["total"], sum(v for k, v in usage.items()
+                                             if k != "total"))
+        stats = tree.stats()
+        self.assertEqual(stats["size"], self.size - 10)
+        self.assertEqual(stats["memory"]["total"], usage["total"])
+        self.assertGreater(stats["height"], 1)
+        self.assertLessEqual(stats["leaf_fill"], 1)
+
+    def test_finger(self):
+        plain = BPlusTree(8)
+        tree = BPlusTree(8, finger=True)
+        packed = BPlusTree(8, finger=True, pack_appends=True)
+        for rid in range(self.size):
+            self.assertTrue(plain.insert(rid, rid))
+            self.assertTrue(tree.insert(rid, rid))
+            self.assertTrue(packed.insert(rid, rid))
+        self.assertGreater(tree.finger_hits, tree.finger_misses * 4)
+        self.assertEqual(plain.finger_hits + plain.finger_misses, 0)
+        self.assertEqual(plain.inorder(), tree.inorder())
+        self.assertLess(tree.stats()["leaf_fill"], 0.75)
+        self.assertGreater(packed.stats()["leaf_fill"], 0.99)
+        for rid in range(0, self.size, 3):
+            self.assertEqual(packed.search(rid), rid)
+            self.assertTrue(packed.delete(rid))
+            self.assertFalse(packed.delete(rid))
+        for rid in random.sample(range(-self.size, self.size * 2), 200):
+            expect = rid if 0 <= rid < self.size and rid % 3 else None
+            self.assertEqual(packed.search(rid), expect)
+        self.assertEqual(packed.inorder(), [rid for rid in range(self.size)
+                                            if rid % 3])
+        self.assertEqual(packed.stats()["finger_hits"], packed.finger_hits)
+
+    def test_relaxed_delete(self):
+        tree = BPlusTree(4, relaxed=True, order_stats=True)
+        rids = random.sample(range(self.size * 4), self.size)
+        for rid in rids:
+            tree.insert(rid, rid)
+        leaves = tree.stats()["leaves"]
+        for rid in rids[:self.size // 2]:
+            self.assertTrue(tree.delete(rid))
+            self.assertFalse(tree.delete(rid))
+        self.assertEqual(tree.delete_many(rids[self.size // 2:][::3])[:1],
+                         [True])
+        kept = rids[self.size // 2:]
+        live = sorted(set(kept) - set(kept[::3]))
+        stats = tree.stats()
+        self.assertEqual(stats["leaves"], leaves)       # Nothing was merged.
+        self.assertGreater(stats["underfull_leaves"], 0)
+        self.assertGreaterEqual(stats["compact_pending"],
+                                stats["underfull_leaves"])
+        self.assertEqual(tree.inorder(), live)
+        pending = tree.compact(limit=5)
+        self.assertLess(pending, stats["compact_pending"])
+        self.assertEqual(tree.compact(), 0)
+        stats = tree.stats()
+        self.assertEqual(stats["underfull_leaves"], 0)
+        self.assertLess(stats["leaves"], leaves)
+        self.assertEqual(tree.inorder(), live)
+        self.assertEqual(tree.count_range(), len(live))
+        for rid in live:
+            self.assertEqual(tree.search(rid), rid)
+            self.assertTrue(tree.delete(rid))
+        self.assertEqual(tree.inorder(), [])
+        tree.compact()
+        self.assertIsNone(tree.root)
+
+    def test_delete_range(self):
+        for kwargs in ({}, {"order_stats": True}):
+            tree = BPlusTree.bulk_load(4, ((rid, rid) for rid in
+                                           range(self.size)), **kwargs)
+            self.assertEqual(tree.delete_range(100, 899), 800)
+            self.assertEqual(tree.delete_range(100, 899), 0)
+            self.assertEqual(tree.delete_range(10, 10), 1)
+            self.assertEqual(tree.delete_range(5, 3), 0)
+            live = [rid for rid in range(self.size)
+                    if rid < 100 and rid != 10 or rid > 899]
+            self.assertEqual(len(tree), len(live))
+            self.assertEqual(tree.inorder(), live)
+            self.assertEqual(list(tree.items(reverse=True)),
+                             [(rid, rid) for rid in reversed(live)])
+            for rid in range(100, 900, 7):
+                self.assertIsNone(tree.search(rid))
+                self.assertTrue(tree.insert(rid, rid))
+            self.assertEqual(tree.delete_range(-1, self.size),
+                             len(live) + len(range(100, 900, 7)))
+            self.assertIsNone(tree.root)
+
+    def test_nearest(self):
+        tree = BPlusTree(4, relaxed=True)
+        self.assertIsNone(tree.floor(1))
+        self.assertIsNone(tree.min())
+        self.assertEqual(tree.nearest(1, 3), [])
+        for rid in range(0, self.size, 10):
+            tree.insert(rid, rid)
+        for rid in range(200, 600, 10):           # Leave some leaves empty.
+            tree.delete(rid)
+        self.assertGreater(tree.stats()["empty_leaves"], 0)
+        self.assertEqual(tree.floor(450), 190)
+        self.assertEqual(tree.floor(190), 190)
+        self.assertEqual(tree.lower(190), 180)
+        self.assertEqual(tree.ceiling(450), 600)
+        self.assertEqual(tree.ceiling(600), 600)
+        self.assertEqual(tree.higher(600), 610)
+        self.assertIsNone(tree.lower(0))
+        self.assertIsNone(tree.higher(self.size))
+        self.assertEqual(tree.floor(-5), None)
+        self.assertEqual(tree.ceiling(self.size * 2), None)
+        self.assertEqual((tree.min(), tree.max()), (0, self.size // 10 * 10))
+        self.assertEqual(tree.nearest(395, 2), [190, 600])
+        self.assertEqual(tree.nearest(605, 4), [600, 610, 620, 630])
+        self.assertEqual(tree.nearest(15, 3), [10, 20, 0])
+        self.assertEqual(tree.nearest(-1, 2), [0, 10])
+        self.assertEqual(len(tree.nearest(0, self.size)), len(tree))
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,165 @@
+import os
+import sys
+import random
+import threading
+import unittest
+
+# Add parent directory to PATH
+current_directory = os.path.dirname(os.path.realpath(__file__))  # pwd
+parent_directory = os.path.dirname(current_directory)            # cd ..
+sys.path.append(parent_directory)
+
+from src.concurrency import *
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.tree = ConcurrentBPlusTree(4)
+        self.threads = 8
+        self.size = 2**9                                     # Rids per thread.
+
+    def test_concurrent_writers(self):
+        errors = []
+
+        def work(n):
+            try:
+                rids = list(range(n, self.threads * self.size, self.threads))
+                random.shuffle(rids)
+                for rid in rids:
+                    self.assertTrue(self.tree.insert(rid, rid))
+                for rid in rids[::2]:
+                    self.assertTrue(self.tree.delete(rid))
+                    self.assertIsNone(self.tree.search(rid))
+                for rid in rids[1::2]:
+                    self.assertEqual(self.tree.search(rid), rid)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=work, args=(n,))
+                   for n in range(self.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        expected = self.tree.inorder_slow()
+        self.assertEqual(len(expected), self.threads * self.size // 2)
+        self.assertEqual(len(self.tree), len(expected))
+        self.assertEqual(self.tree.inorder(), expected)
+
+    def test_search_many(self):
+        plain = BPlusTree(4)
+        for rid in range(0, self.size, 2):
+            data = None if rid % 4 else rid                  # Some store None.
+            self.tree.insert(rid, data)
+            plain.insert(rid, data)
+        rids = list(range(self.size))
+        random.shuffle(rids)
+        expected = plain.search_many(rids, default=-1)
+        self.assertEqual(self.tree.search_many(rids, default=-1), expected)
+        self.assertEqual(expected.count(None), self.size // 4)
+        self.assertEqual(expected.count(-1), self.size // 2)
+
+    def test_concurrent_scans(self):
+        for rid in range(0, 4 * self.size, 2):
+            self.tree.insert(rid, rid)
+        stop = threading.Event()
+        errors = []
+
+        def scan():
+            while not stop.is_set():
+                rids = [rid for rid, _ in self.tree.items(100, 900)]
+                evens = [rid for rid in rids if rid % 2 == 0]
+                if evens != list(range(100, 901, 2)) or rids != sorted(rids):
+                    errors.append(rids)
+                back = [rid for rid, _ in self.tree.items(reverse=True)]
+                if back != sorted(back, reverse=True):
+                    errors.append(back)
+
+        readers = [threading.Thread(target=scan) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        for _ in range(3):                           # Churn the odd rids only.
+            for rid in range(1, 4 * self.size, 2):
+                self.tree.insert(rid)
+            for rid in range(1, 4 * self.size, 2):
+                self.tree.delete(rid)
+        stop.set()
+        for reader in readers:
+            reader.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.tree.range(10, 20), [10, 12, 14, 16, 18, 20])
+        self.assertEqual([rid for rid, _ in self.tree.items(limit=3)],
+                         [0, 2, 4])
+
+    def test_concurrent_reverse_scans(self):
+        fixed = list(range(0, 4 * self.size, 4))            # Never written to.
+        for rid in fixed:
+            self.tree.insert(rid, rid)
+        stop = threading.Event()
+        errors = []
+
+        def churn(m):                     # Insert and delete rids = m (mod 4).
+            rids = list(range(m, 4 * self.size, 4))
+            for _ in range(10):
+                random.shuffle(rids)
+                for rid in rids:
+                    self.tree.insert(rid, rid)
+                random.shuffle(rids)
+                for rid in rids:
+                    self.tree.delete(rid)
+
+        def scan():
+            while not stop.is_set():
+                back = [rid for rid, _ in self.tree.items(reverse=True)
+                        if rid % 4 == 0]
+                if back != fixed[::-1]:
+                    errors.append(len(back))
+                top = self.tree.max()
+                if top is None or top < fixed[-1]:
+                    errors.append(top)
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-5)             # Switch threads mid-operation.
+        try:
+            readers = [threading.Thread(target=scan) for _ in range(3)]
+            writers = [threading.Thread(target=churn, args=(m,))
+                       for m in (1, 2, 3)]
+            for thread in readers + writers:
+                thread.start()
+            for thread in writers:
+                thread.join()
+            stop.set()
+            for thread in readers:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertEqual(errors, [])
+        self.assertEqual(self.tree.inorder(), fixed)
+
+    def test_split_during_reverse_scan(self):
+        fixed = list(range(0, 4 * self.size, 4))
+        for rid in fixed:
+            self.tree.insert(rid, rid)
+        leaf = self.tree.find_leaf(3 * self.size)
+        extra = [rid for rid in range(leaf.keys[0], leaf.keys[-1])
+                 if rid % 4]                        # Enough to split the leaf.
+        tree = self.tree
+
+        class SplitFirst(RWLatch):
+            """ Split the leaf just as a reverse scan steps onto it. """
+            def try_read(self):
+                leaf.latch = RWLatch()
+                for rid in extra:
+                    tree.insert(rid, rid)
+                return leaf.latch.try_read()
+
+        leaf.latch = SplitFirst()
+        back = [rid for rid, _ in self.tree.items(reverse=True)]
+        self.assertNotIsInstance(leaf.latch, SplitFirst)          # It stepped.
+        self.assertEqual([rid for rid in back if rid % 4 == 0], fixed[::-1])
+        self.assertEqual(back, sorted(back, reverse=True))
+        self.assertEqual(self.tree.inorder(), sorted(fixed + extra))
+
+if __name__ == '__main__':
+    unittest.main()
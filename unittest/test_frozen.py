@@ -0,0 +1,57 @@
+import os
+import sys
+import random
+import tempfile
+import unittest
+
+# Add parent directory to PATH
+current_directory = os.path.dirname(os.path.realpath(__file__))  # pwd
+parent_directory = os.path.dirname(current_directory)            # cd ..
+sys.path.append(parent_directory)
+
+from src.bplus import BPlusTree
+from src.frozen import *
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.size = 2**10
+        self.rids = sorted(random.sample(range(2**40), self.size))
+        pairs = ((rid, str(rid)) for rid in self.rids)
+        self.tree = BPlusTree.bulk_load(8, pairs)
+        fd, self.path = tempfile.mkstemp(suffix=".frozen")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def check(self, frozen):
+        self.assertEqual(len(frozen), self.size)
+        self.assertEqual(frozen.inorder(), self.rids)
+        for rid in self.rids:
+            self.assertEqual(frozen.search(rid), str(rid))
+            self.assertIsNone(frozen.search(rid + 1))
+        lo, hi = self.rids[100], self.rids[200]
+        self.assertEqual(frozen.range(lo, hi), self.tree.range(lo, hi))
+        self.assertEqual(frozen.range(lo + 1, hi - 1), self.rids[101:200])
+        self.assertEqual(list(frozen.items(lo, hi, limit=3)),
+                         list(self.tree.items(lo, hi, limit=3)))
+
+    def test_freeze(self):
+        self.check(self.tree.freeze())
+
+    def test_save_and_open(self):
+        self.tree.freeze(fanout=16).save(self.path)
+        self.assertEqual(HEADER.size % 8, 0)         # The arrays stay aligned.
+        with FrozenBPlusTree.open(self.path) as frozen:
+            self.check(frozen)
+
+    def test_save_needs_int_rids(self):
+        frozen = BPlusTree.bulk_load(3, [("a", 1), ("b", 2)]).freeze()
+        self.assertEqual(frozen.search("b"), 2)
+        with self.assertRaises(TypeError):
+            frozen.save(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import random
+import unittest
+from time import perf_counter_ns
+
+# Add parent directory to PATH
+current_directory = os.path.dirname(os.path.realpath(__file__))  # pwd
+parent_directory = os.path.dirname(current_directory)            # cd ..
+sys.path.append(parent_directory)
+
+from src.bplus import *
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.tree = BPlusTree(4)
+        self.size = 2**10
+
+    def test_counters(self):
+        ops = []
+        probe = self.tree.instrument(hook=lambda op, ns: ops.append(op))
+        rids = random.sample(range(self.size * 4), self.size)
+        for rid in rids:
+            self.tree.insert(rid, rid)
+        for rid in rids[::2]:
+            self.tree.delete(rid)
+        for rid in rids:
+            self.tree.search(rid)
+        self.tree.insert_many((rid, rid) for rid in rids[::2])
+        stats = probe.stats()
+        self.assertEqual(ops.count("insert"), self.size)
+        self.assertEqual(ops.count("insert_many"), 1)
+        self.assertEqual(stats["latency"]["search"]["count"], self.size)
+        seeks = self.size * 5 // 2                    # insert, delete, search.
+        self.assertGreater(stats["descents"] + stats["finger_hits"], seeks)
+        self.assertGreaterEqual(stats["nodes_per_descent"], 1)
+        self.assertEqual(stats["height"], self.tree.stats()["height"])
+        self.assertGreater(stats["events"]["split"], 0)
+        self.assertEqual(stats["events"]["split"], stats["events"]["rotate"])
+        self.assertEqual(sum(stats["merges"]["merge_leaf"].values()),
+                         self.size // 2)
+        self.assertGreater(stats["comparisons"], stats["nodes_visited"])
+        probe.reset()
+        self.assertEqual(probe.stats()["descents"], 0)
+        self.assertEqual(probe.stats()["latency"], {})
+        self.tree.search(rids[0])
+        self.assertEqual(probe.stats()["latency"]["search"]["count"], 1)
+
+    def test_lazy_scans(self):
+        times = []
+        probe = self.tree.instrument(hook=lambda op, ns: times.append(ns))
+        self.tree.insert_many((rid, rid) for rid in range(self.size))
+        pairs = self.tree.items()
+        self.assertEqual(next(pairs), (0, 0))
+        self.assertNotIn("items", probe.stats()["latency"])       # Still open.
+        start = perf_counter_ns()
+        self.assertEqual(len(list(pairs)), self.size - 1)
+        scanned = perf_counter_ns() - start
+        self.assertEqual(probe.stats()["latency"]["items"]["count"], 1)
+        self.assertGreaterEqual(times[-1], scanned)
+        pairs = self.tree.items(lo=10)
+        next(pairs)
+        pairs.close()                                     # Abandoned mid-scan.
+        self.assertEqual(probe.stats()["latency"]["items"]["count"], 2)
+
+    def test_detach(self):
+        with self.tree.instrument() as probe:
+            self.tree.insert_many((rid, rid) for rid in range(self.size))
+            self.assertIn("insert", vars(self.tree))
+        self.assertNotIn("insert", vars(self.tree))
+        self.assertNotIn("seek", vars(self.tree))
+        self.tree.insert(self.size, self.size)
+        self.assertNotIn("insert", probe.stats()["latency"])
+        self.assertEqual(self.tree.inorder(), list(range(self.size + 1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import sys
+import random
+import tempfile
+import unittest
+
+# Add parent directory to PATH
+current_directory = os.path.dirname(os.path.realpath(__file__))  # pwd
+parent_directory = os.path.dirname(current_directory)            # cd ..
+sys.path.append(parent_directory)
+
+from src.paged import *
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".bpt")
+        os.close(fd)
+        os.remove(self.path)
+        self.size = 2**10
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_paged_tree(self):
+        rids = random.sample(range(-2**40, 2**40), self.size)
+        with PagedBPlusTree(self.path, deg=8, pool_size=16) as tree:
+            for rid in rids:
+                self.assertTrue(tree.insert(rid, str(rid)))
+            self.assertFalse(tree.insert(rids[0]))
+            self.assertEqual(tree.inorder(), sorted(rids))
+            stats = tree.stats()
+            self.assertGreater(stats["misses"], 0)
+            self.assertLessEqual(stats["cached"], 16)
+        with PagedBPlusTree(self.path, pool_size=16) as tree:  # Reopen it.
+            self.assertEqual(len(tree), self.size)
+            for rid in rids:
+                self.assertEqual(tree.search(rid), str(rid))
+            lo, hi = sorted(rids)[10], sorted(rids)[20]
+            self.assertEqual(tree.range(lo, hi), sorted(rids)[10:21])
+            for rid in rids[::2]:
+                self.assertTrue(tree.delete(rid))
+                self.assertIsNone(tree.search(rid))
+            self.assertEqual(tree.inorder(), sorted(rids[1::2]))
+
+    def test_rejects_bad_input(self):
+        with PagedBPlusTree(self.path, deg=8, page_size=512) as tree:
+            with self.assertRaises(TypeError):
+                tree.insert("rid")
+            with self.assertRaises(ValueError):
+                tree.insert(1, "x" * 512)
+
+    def test_variable_size_data(self):
+        sizes = random.choices(range(2000), k=self.size)
+        rids = random.sample(range(2**40), self.size)
+        with PagedBPlusTree(self.path, pool_size=8) as tree:
+            self.assertEqual(tree.max_data_size, 2028)
+            self.assertTrue(tree.insert(40, "x" * 40))
+            for rid, size in zip(rids, sizes):
+                self.assertTrue(tree.insert(rid, "v" * size))
+            for rid in rids[::3]:
+                self.assertTrue(tree.delete(rid))
+        with PagedBPlusTree(self.path, pool_size=8) as tree:
+            kept = {rid: "v" * size for rid, size in zip(rids, sizes)}
+            for rid in rids[::3]:
+                del kept[rid]
+            kept[40] = "x" * 40
+            self.assertEqual(dict(tree.items()), kept)
+            for rid in rids[1::3]:
+                self.assertTrue(tree.delete(rid))
+            self.assertEqual(len(tree), len(kept) - len(rids[1::3]))
+
+    def test_large_pages(self):
+        with PagedBPlusTree(self.path, deg=4, page_size=1 << 19) as tree:
+            self.assertEqual(tree.max_data_size, DATA_MAX)
+            with self.assertRaises(ValueError):
+                tree.insert(1, b"x" * 100000)
+            self.assertTrue(tree.insert(2, b"y" * 60000))
+        with PagedBPlusTree(self.path) as tree:
+            self.assertEqual(tree.search(2), b"y" * 60000)
+            self.assertIsNone(tree.search(1))
+
+    def test_close_releases_file(self):
+        tree = PagedBPlusTree(self.path, deg=8)
+        fd = tree.pager.fd
+        tree.pool.flush = lambda: 1 / 0                 # A failing write-back.
+        self.assertRaises(ZeroDivisionError, tree.close)
+        self.assertRaises(OSError, os.fstat, fd)
+
+
+if __name__ == '__main__':
+    unittest.main()
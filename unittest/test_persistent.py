@@ -0,0 +1,86 @@
+import os
+import sys
+import gc
+import random
+import threading
+import unittest
+
+# Add parent directory to PATH
+current_directory = os.path.dirname(os.path.realpath(__file__))  # pwd
+parent_directory = os.path.dirname(current_directory)            # cd ..
+sys.path.append(parent_directory)
+
+from src.persistent import *
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.tree = VersionedBPlusTree(4)
+        self.size = 2**10
+
+    def test_versioned_tree(self):
+        rids = random.sample(range(self.size * 4), self.size)
+        for rid in rids:
+            self.assertTrue(self.tree.insert(rid, str(rid)))
+        self.assertFalse(self.tree.insert(rids[0]))
+        self.assertEqual(self.tree.inorder(), sorted(rids))
+        self.assertEqual(len(self.tree), self.size)
+        for rid in rids[::2]:
+            self.assertTrue(self.tree.delete(rid))
+        self.assertFalse(self.tree.delete(rids[0]))
+        self.assertEqual(self.tree.inorder(), sorted(rids[1::2]))
+        for rid in rids[1::2]:
+            self.assertEqual(self.tree.search(rid), str(rid))
+        self.assertIsNone(self.tree.search(rids[0]))
+        self.assertEqual(self.tree.delete_many(rids), [False, True] *
+                         (self.size // 2))
+        self.assertEqual(self.tree.inorder(), [])
+
+    def test_snapshot(self):
+        self.tree.insert_many((rid, rid) for rid in range(self.size))
+        version = self.tree.version
+        snap = self.tree.snapshot()
+        self.tree.delete_many(range(0, self.size, 2))
+        self.tree.insert(self.size, self.size)
+        self.assertEqual(snap.version, version)
+        self.assertEqual(snap.inorder(), list(range(self.size)))
+        self.assertEqual(len(snap), self.size)
+        self.assertEqual(snap.search(2), 2)
+        self.assertIsNone(self.tree.search(2))
+        self.assertEqual(list(snap.items(10, 13, reverse=True)),
+                         [(13, 13), (12, 12), (11, 11), (10, 10)])
+        self.assertEqual(self.tree.range(10, 15), [11, 13, 15])
+        self.assertEqual(len(self.tree.snapshots), 1)
+        with snap:
+            pass
+        self.assertEqual(snap.inorder(), [])
+        del snap
+        gc.collect()
+        self.assertEqual(len(self.tree.snapshots), 0)
+
+    def test_scan_during_writes(self):
+        self.tree.insert_many((rid, rid) for rid in range(0, self.size, 2))
+        stop = threading.Event()
+
+        def write():
+            while not stop.is_set():
+                self.tree.insert_many((rid, rid)
+                                      for rid in range(1, self.size, 2))
+                self.tree.delete_many(range(1, self.size, 2))
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            for _ in range(20):
+                with self.tree.snapshot() as snap:
+                    rids = snap.inorder()
+                    self.assertEqual(len(rids), len(snap))
+                self.assertIn(len(rids), (self.size // 2, self.size))
+                self.assertEqual(rids, sorted(rids))
+        finally:
+            stop.set()
+            writer.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import sys
+import asyncio
+import random
+import unittest
+
+# Add parent directory to PATH
+current_directory = os.path.dirname(os.path.realpath(__file__))  # pwd
+parent_directory = os.path.dirname(current_directory)            # cd ..
+sys.path.append(parent_directory)
+
+from src.server import *
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.size = 2**10
+
+    def test_server(self):
+        asyncio.run(self.session())
+
+    async def session(self):
+        server = TreeServer()
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        client = await TreeClient.connect(port=port)
+        rids = random.sample(range(-2**40, 2**40), self.size)
+        flags = await asyncio.gather(*(client.insert(rid, str(rid).encode())
+                                       for rid in rids))
+        self.assertEqual(flags, [True] * self.size)
+        self.assertLess(server.batches, self.size)       # Requests coalesced.
+        self.assertFalse(await client.insert(rids[0], b""))
+        values = await asyncio.gather(*(client.search(rid) for rid in rids))
+        self.assertEqual(values, [str(rid).encode() for rid in rids])
+        replies = await asyncio.gather(client.delete(rids[0]),
+                                       client.search(rids[0]),
+                                       client.delete(rids[0]))
+        self.assertEqual(replies, [True, None, False])    # Order is kept.
+        pairs = [pair async for pair in client.range(-2**62, 2**62)]
+        self.assertEqual(pairs, [(rid, str(rid).encode())
+                                 for rid in sorted(rids[1:])])
+        async for _ in client.range(-2**62, 2**62):
+            break                                         # Stop early.
+        self.assertEqual(await client.search(rids[1]), str(rids[1]).encode())
+        await client.close()
+        listener.close()
+        await listener.wait_closed()
+
+
+if __name__ == '__main__':
+    unittest.main()
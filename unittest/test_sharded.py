@@ -0,0 +1,51 @@
+import os
+import sys
+import random
+import unittest
+
+# Add parent directory to PATH
+current_directory = os.path.dirname(os.path.realpath(__file__))  # pwd
+parent_directory = os.path.dirname(current_directory)            # cd ..
+sys.path.append(parent_directory)
+
+from src.sharded import *
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.tree = ShardedBPlusTree(4, shards=3)
+        self.size = 2**10
+
+    def tearDown(self):
+        self.tree.close()
+
+    def test_sharded_tree(self):
+        rids = random.sample(range(self.size * 4), self.size)
+        self.assertEqual(self.tree.insert_many((rid, rid) for rid in rids),
+                         [True] * self.size)
+        self.assertFalse(self.tree.insert(rids[0]))
+        self.assertEqual(self.tree.sizes(), [self.size, 0, 0])
+        self.assertTrue(self.tree.rebalance())
+        self.assertEqual(sorted(self.tree.sizes()),
+                         [self.size // 3, self.size // 3, self.size // 3 + 1])
+        self.assertFalse(self.tree.rebalance())
+        self.assertEqual(len(self.tree), self.size)
+        self.assertEqual(self.tree.inorder(), sorted(rids))
+        self.assertEqual(self.tree.search_many(rids + [-1], "none"),
+                         rids + ["none"])
+        queries = [(0, self.size), (self.size, self.size * 3), (5, 1)]
+        self.assertEqual(self.tree.range_many(queries),
+                         [sorted(rid for rid in rids if lo <= rid <= hi)
+                          for lo, hi in queries])
+        for rid in rids[::2]:
+            self.assertTrue(self.tree.delete(rid))
+            self.assertIsNone(self.tree.search(rid))
+        self.assertEqual(self.tree.delete_many(rids[:4]),
+                         [False, True, False, True])
+        self.assertEqual(self.tree.range(-1, self.size * 4),
+                         sorted(rids[1::2][2:]))
+        self.assertRaises(TypeError, self.tree.range, None, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
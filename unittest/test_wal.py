@@ -0,0 +1,100 @@
+import os
+import sys
+import random
+import tempfile
+import time
+import unittest
+
+# Add parent directory to PATH
+current_directory = os.path.dirname(os.path.realpath(__file__))  # pwd
+parent_directory = os.path.dirname(current_directory)            # cd ..
+sys.path.append(parent_directory)
+
+from src.wal import *
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "index")
+        self.size = 2**9
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_recovery(self):
+        rids = random.sample(range(2**40), self.size)
+        tree = LoggedBPlusTree(self.path, 4, sync="group", group_size=16)
+        for rid in rids:
+            self.assertTrue(tree.insert(rid, rid))
+        for rid in rids[::2]:
+            self.assertTrue(tree.delete(rid))
+        tree.commit()
+        tree.wal.fp.close()                     # Crash without a checkpoint.
+        tree = LoggedBPlusTree(self.path, 4)
+        self.assertEqual(tree.inorder(), sorted(rids[1::2]))
+        self.assertEqual(tree.since_checkpoint, self.size + self.size // 2)
+        tree.close()
+
+    def test_checkpoint_truncates_log(self):
+        with LoggedBPlusTree(self.path, 4, checkpoint_every=100) as tree:
+            tree.insert_many((rid, str(rid)) for rid in range(250))
+            tree.delete_many(range(0, 250, 5))
+            self.assertLess(os.path.getsize(self.path + ".wal"), 100 * 64)
+        with LoggedBPlusTree(self.path, 4) as tree:
+            expected = [rid for rid in range(250) if rid % 5]
+            self.assertEqual(tree.inorder(), expected)
+            self.assertEqual(tree.search(7), "7")
+
+    def test_torn_tail_is_dropped(self):
+        with LoggedBPlusTree(self.path, 4, sync="always") as tree:
+            tree.insert(1, "a")
+            tree.insert(2, "b")
+        with open(self.path + ".wal", "ab") as fp:
+            fp.write(b"\x01\x02\x03")                 # Half-written record.
+        with LoggedBPlusTree(self.path, 4) as tree:
+            self.assertEqual(tree.inorder(), [1, 2])
+            tree.insert(3, "c")
+        with LoggedBPlusTree(self.path, 4) as tree:
+            self.assertEqual(tree.inorder(), [1, 2, 3])
+
+    def test_rejected_mutations_are_not_logged(self):
+        with LoggedBPlusTree(self.path, 4, sync="always") as tree:
+            tree.insert(1, "a")
+            with self.assertRaises(TypeError):
+                tree.insert("b", "b")
+            with self.assertRaises(TypeError):
+                tree.delete("b")
+            with self.assertRaises(TypeError):
+                tree.insert_many([(2, "c"), ("d", "d")])
+            tree.insert_many([(2, "c"), (3, "d")])
+        with LoggedBPlusTree(self.path, 4) as tree:          # Replays cleanly.
+            self.assertEqual(tree.inorder(), [1, 2, 3])
+            self.assertEqual(tree.since_checkpoint, 3)
+
+    def test_one_sync_per_batch(self):
+        with LoggedBPlusTree(self.path, 4, sync="always") as tree:
+            tree.insert_many((rid, rid) for rid in range(500))
+            tree.delete_many(range(0, 500, 2))
+            self.assertEqual(tree.wal.syncs, 2)
+            self.assertEqual(tree.wal.appended, 750)
+        with LoggedBPlusTree(self.path, 4) as tree:
+            self.assertEqual(tree.inorder(), list(range(1, 500, 2)))
+
+    def test_group_interval_when_idle(self):
+        wal = WriteAheadLog(self.path + ".wal", sync="group",
+                            group_size=1000, group_interval=0.02)
+        wal.append(INSERT, 1, "a")
+        self.assertEqual((wal.pending, wal.syncs), (1, 0))
+        time.sleep(0.3)                                # No more writes arrive.
+        self.assertEqual((wal.pending, wal.syncs), (0, 1))
+        wal.append(INSERT, 2, "b")
+        wal.close()
+        self.assertEqual(wal.syncs, 2)
+        wal = WriteAheadLog(self.path + ".wal")
+        self.assertEqual([rid for _, rid, _ in wal.records()], [1, 2])
+        wal.close()
+
+
+if __name__ == '__main__':
+    unittest.main()